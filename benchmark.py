@@ -1,5 +1,11 @@
+import itertools
+import statistics
+import sys
+import time
 import timeit
 
+sys.path.insert(0, "stubs")
+
 
 def benchmark_lexer():
     setup = """
@@ -62,4 +68,188 @@ tokens = list(lexer.tokenize())
     print(f"Average time per run: {result/iterations:.6f} seconds")
 
 
+def benchmark_typing(keys_per_second: int = 0):
+    from rasper_ducky.duckyscript.keyboard import RasperDuckyKeyboard
+
+    keyboard = RasperDuckyKeyboard("win", "uk")
+    keyboard.set_rate(keys_per_second)
+
+    # Time of each key press, a report can press a key and release others
+    timestamps = []
+    previous = bytes(8)
+
+    def send_report(report):
+        nonlocal previous
+        if any(key and key not in previous[2:] for key in report[2:]):
+            timestamps.append(time.monotonic_ns())
+        previous = bytes(report)
+
+    keyboard.device.send_report = send_report
+    keyboard.type_string("Get-ChildItem -Path C:\\ -Recurse | Out-File files.txt " * 4)
+
+    intervals = [b - a for a, b in itertools.pairwise(timestamps)]
+    elapsed = (timestamps[-1] - timestamps[0]) / 1_000_000_000
+    target = keyboard.keystroke_interval_ns
+    jitter = statistics.pstdev(intervals) / 1000
+    lateness = max(abs(interval - target) for interval in intervals) / 1000
+    print(
+        f"Typing at {keys_per_second or 'unlimited'} keys/s: "
+        f"{len(intervals) / elapsed:.0f} keystrokes/s, "
+        f"jitter {jitter:.1f} us, max deviation {lateness:.1f} us"
+    )
+
+
+def benchmark_abort():
+    from rasper_ducky.duckyscript.abort import PayloadAborted
+    from rasper_ducky.duckyscript.clock import Clock
+    from rasper_ducky.duckyscript.interpreter import Interpreter
+    from rasper_ducky.duckyscript.lexer import Lexer
+    from rasper_ducky.duckyscript.parser import Parser
+    from rasper_ducky.duckyscript.simulation import SimulatedDevice
+
+    def parse(code):
+        return Parser(list(Lexer(code).tokenize())).parse()
+
+    class Never:
+        def triggered(self):
+            return False
+
+    class After:
+        def __init__(self, at_ns):
+            self.at_ns = at_ns
+
+        def triggered(self):
+            return time.monotonic_ns() >= self.at_ns
+
+    # Cost of the abort checks, on a loop doing nothing but statements
+    loop = parse("$x = 0\nWHILE ($x < 20000)\n$x = $x + 1\n$y = $x\nEND_WHILE\n")
+    for sources in ((), (Never(),)):
+        start = time.perf_counter_ns()
+        Interpreter(abort_sources=sources).interpret(loop)
+        per_statement = (time.perf_counter_ns() - start) / 40_000
+        print(
+            f"Interpreting with {len(sources)} abort source(s): "
+            f"{per_statement:.0f} ns per statement"
+        )
+    flag = Interpreter().abort_flag
+    check = timeit.timeit("flag.requested", globals={"flag": flag}, number=1_000_000)
+    print(f"Abort flag check: {check * 1000:.0f} ns per statement")
+
+    # Time from the abort to the release of the keys, while typing at 100 keys/s
+    clock = Clock()
+    device = SimulatedDevice(clock)
+    abort_ns = time.monotonic_ns() + 50_000_000
+    interpreter = Interpreter(device, clock, [After(abort_ns)])
+    try:
+        interpreter.interpret(parse("STRING_DELAY 10\nSTRING " + "ab" * 100 + "\n"))
+    except PayloadAborted:
+        pass
+    latency = (device.events[-1][0] - abort_ns) / 1000
+    print(f"Abort to release latency: {latency:.0f} us")
+
+
+def benchmark_hooks():
+    from rasper_ducky.duckyscript.interpreter import Interpreter
+    from rasper_ducky.duckyscript.lexer import Lexer
+    from rasper_ducky.duckyscript.parser import Parser
+    from rasper_ducky.duckyscript.tracing import Tracer
+
+    code = "$x = 0\nWHILE ($x < 20000)\n$x = $x + 1\n$y = $x\nEND_WHILE\n"
+    loop = Parser(list(Lexer(code).tokenize())).parse()
+
+    class Checking(Interpreter):
+        # The statement loop checking for tracers on each statement, instead of
+        # binding them once like add_tracer
+        tracers = ()
+
+        def _execute(self, node):
+            self._step(node)
+            if self.tracers:
+                for tracer in self.tracers:
+                    tracer.before_statement(node)
+            self._dispatch(node)
+            if self.tracers:
+                for tracer in self.tracers:
+                    tracer.after_statement(node)
+
+    def run(interpreter):
+        start = time.perf_counter_ns()
+        interpreter.interpret(loop)
+        return (time.perf_counter_ns() - start) / 40_000
+
+    traced = Interpreter()
+    traced.add_tracer(Tracer())
+    # Best of 5 runs, the other runs being disturbed by the host
+    checking = min(run(Checking()) for _ in range(5))
+    without_hooks = min(run(Interpreter()) for _ in range(5))
+    with_hooks = min(run(traced) for _ in range(5))
+    print(
+        f"Statements: {checking:.0f} ns checking for hooks, "
+        f"{without_hooks:.0f} ns with no hook, "
+        f"{with_hooks:.0f} ns with an empty tracer"
+    )
+
+
+def benchmark_boot():
+    import io
+
+    from rasper_ducky.duckyscript import compiled
+    from rasper_ducky.duckyscript.clock import Clock
+    from rasper_ducky.duckyscript.interpreter import Interpreter
+    from rasper_ducky.duckyscript.lexer import Lexer
+    from rasper_ducky.duckyscript.parser import Parser
+    from rasper_ducky.duckyscript.preprocessor import Preprocessor
+
+    class FirstKeystroke(Exception):
+        pass
+
+    class Device:
+        # Stops the payload on its first key press
+        def send_report(self, report, report_id=None):
+            if any(report):
+                raise FirstKeystroke
+
+        def get_last_received_report(self, report_id=None):
+            return None
+
+    functions = "".join(
+        f"FUNCTION f{i}()\n    $x = ($x + {i}) * 2\n    IF ($x > 100) THEN\n"
+        f"        STRINGLN line {i}\n    END_IF\nEND_FUNCTION\n"
+        for i in range(200)
+    )
+    source = f"DEFINE #COUNT 3\n$x = 0\n{functions}STRING Hello\n"
+
+    def compile_source():
+        code = Preprocessor().process(source)
+        return Parser(list(Lexer(code).tokenize())).parse()
+
+    dumped = io.StringIO()
+    compiled.dump(compile_source(), source, dumped)
+
+    def load_compiled():
+        return compiled.load(source, io.StringIO(dumped.getvalue()))
+
+    def to_first_keystroke(load):
+        start = time.perf_counter_ns()
+        try:
+            Interpreter(Device(), Clock()).interpret(load())
+        except FirstKeystroke:
+            pass
+        return (time.perf_counter_ns() - start) / 1_000_000
+
+    # Best of 5 runs, the other runs being disturbed by the host
+    compiling = min(to_first_keystroke(compile_source) for _ in range(5))
+    loading = min(to_first_keystroke(load_compiled) for _ in range(5))
+    print(
+        f"Start to first keystroke of a {len(source.splitlines())} lines payload: "
+        f"{compiling:.2f} ms compiled, {loading:.2f} ms loaded"
+    )
+
+
 benchmark_lexer()
+benchmark_boot()
+benchmark_hooks()
+benchmark_abort()
+benchmark_typing()
+benchmark_typing(100)
+benchmark_typing(500)
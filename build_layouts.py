@@ -0,0 +1,50 @@
+"""Compile the keyboard layouts shipped in rasper_ducky/lib into layout tables.
+
+The tables are written to rasper_ducky/layouts, copy that folder to the root of
+the CIRCUITPY drive along with the rest of rasper_ducky. Layouts with a table
+are loaded from it instead of importing their keyboard_layout_* and keycode_*
+modules.
+
+Usage: python build_layouts.py SOURCES_DIR
+
+SOURCES_DIR holds the keyboard_layout_*.py and keycode_*.py sources of
+https://github.com/Neradoc/Circuitpython_Keyboard_Layouts, and adafruit_hid
+must be importable (pip install adafruit-circuitpython-hid).
+"""
+
+import os
+import sys
+
+from rasper_ducky.duckyscript.layout_table import LayoutTable
+
+LIB_DIR = "rasper_ducky/lib"
+OUTPUT_DIR = "rasper_ducky/layouts"
+
+
+def layout_names():
+    files = os.listdir(LIB_DIR)
+    for file in sorted(files):
+        if file.startswith("keyboard_layout_") and file.endswith(".mpy"):
+            name = file[len("keyboard_layout_") : -len(".mpy")]
+            if f"keycode_{name}.mpy" in files:
+                yield name
+
+
+def build_layouts(sources_dir: str):
+    sys.path.insert(0, sources_dir)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    for name in layout_names():
+        layout = __import__(f"keyboard_layout_{name}")
+        keycode = __import__(f"keycode_{name}")
+        table = LayoutTable.from_modules(layout, keycode)
+        path = f"{OUTPUT_DIR}/{name}.rdl"
+        table.save(path)
+        print(f"{path}: {len(table.to_bytes())} bytes")
+
+
+if len(sys.argv) != 2:
+    print(__doc__)
+    sys.exit(1)
+
+build_layouts(sys.argv[1])
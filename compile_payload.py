@@ -0,0 +1,47 @@
+"""Compile payloads on the computer, so that the Pico doesn't have to at boot.
+
+Each payload is compiled and checked like on the device, and its compiled form
+is written next to it as PAYLOAD.compiled. Copy payload.dd.compiled to the
+CIRCUITPY drive along with payload.dd: main.py loads it instead of compiling
+the payload as long as payload.dd and rasper_ducky are left unchanged.
+
+Usage: python compile_payload.py PAYLOAD...
+"""
+
+import sys
+
+sys.path.insert(0, "stubs")
+
+from rasper_ducky.duckyscript import compiled
+from rasper_ducky.duckyscript.checker import LayoutChecker
+from rasper_ducky.duckyscript.lexer import Lexer
+from rasper_ducky.duckyscript.parser import Parser
+from rasper_ducky.duckyscript.preprocessor import Preprocessor
+
+
+def compile_payload(path: str) -> bool:
+    # Line endings are kept as they are, like the device reads them
+    with open(path, "r", newline="") as file:
+        source = file.read()
+
+    try:
+        code = Preprocessor().process(source)
+        ast = Parser(list(Lexer(code).tokenize())).parse()
+        LayoutChecker().check(ast)
+    except (SyntaxError, ValueError, RuntimeError) as error:
+        print(f"{path}: {type(error).__name__}: {error}")
+        return False
+
+    with open(f"{path}.compiled", "w", newline="") as file:
+        compiled.dump(ast, source, file)
+    print(f"{path}: compiled to {path}.compiled")
+    return True
+
+
+payloads = sys.argv[1:]
+if not payloads:
+    print(__doc__)
+    sys.exit(1)
+
+results = [compile_payload(payload) for payload in payloads]
+sys.exit(0 if all(results) else 1)
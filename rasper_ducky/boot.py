@@ -16,3 +16,6 @@ else:
 
 if no_storage:
     storage.disable_usb_drive()
+    # The host can't write to the drive anymore, let main.py keep the compiled
+    # payload on it
+    storage.remount("/", readonly=False)
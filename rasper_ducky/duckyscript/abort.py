@@ -0,0 +1,52 @@
+import digitalio
+
+
+class PayloadAborted(RuntimeError):
+    pass
+
+
+class AbortFlag:
+    """Cancellation flag shared by the interpreter, its keyboard and its delays.
+
+    The flag is set by `request`, or by one of the sources (objects with a
+    `triggered()` method, like `AbortButton`) when they are polled.
+    """
+
+    def __init__(self, sources=()):
+        self.sources = tuple(sources)
+        self.requested = False
+
+    def request(self):
+        self.requested = True
+
+    def poll(self) -> bool:
+        """Check the sources, return whether an abort was requested."""
+        if not self.requested:
+            for source in self.sources:
+                if source.triggered():
+                    self.requested = True
+        return self.requested
+
+    def check(self):
+        """Raise PayloadAborted if an abort was requested."""
+        if self.requested or (self.sources and self.poll()):
+            raise PayloadAborted("Payload aborted")
+
+
+class AbortButton:
+    """Push button between a pin and the ground, triggered when pressed.
+
+    Only a press counts, a button already held down when created, like the
+    GP15 jumper disabling the USB drive at boot, doesn't trigger.
+    """
+
+    def __init__(self, pin):
+        self.pin = digitalio.DigitalInOut(pin)
+        self.pin.switch_to_input(pull=digitalio.Pull.UP)
+        self.released = self.pin.value
+
+    def triggered(self) -> bool:
+        released = self.pin.value
+        pressed = self.released and not released
+        self.released = released
+        return pressed
@@ -0,0 +1,280 @@
+import asyncio
+from array import array
+
+from .clock import SPIN_NS
+from .interpreter import LED_WAITS, Interpreter
+from .parser import (
+    Assign,
+    Binary,
+    Call,
+    DelayStmt,
+    Expr,
+    ExpressionStmt,
+    Grouping,
+    IfStmt,
+    KeyPressStmt,
+    RandomCharFromStmt,
+    RandomCharStmt,
+    Stmt,
+    StringLnStmt,
+    StringStmt,
+    Unary,
+    VarStmt,
+    WaitForLedStmt,
+    WhileStmt,
+)
+from .scheduler import ABORT_POLL_NS
+from .tracing import KEYBOARD_STATEMENTS, Tracer
+
+
+def _calls(node: Expr) -> bool:
+    """Whether `node` calls a function."""
+    if isinstance(node, Call):
+        return True
+    elif isinstance(node, Binary):
+        return _calls(node.left) or _calls(node.right)
+    elif isinstance(node, Unary):
+        return _calls(node.right)
+    elif isinstance(node, Assign):
+        return _calls(node.value)
+    elif isinstance(node, Grouping):
+        return _calls(node.expression)
+    return False
+
+
+class AsyncInterpreter(Interpreter):
+    """Interpreter running a payload as an asyncio task.
+
+    DELAYs, waits on the host LEDs and the time between typed keystrokes give
+    control back to the event loop, so that other tasks (button watcher, status
+    LED, serial logger...) run alongside the payload. Functions run in the
+    event loop too, even when called from an expression.
+    """
+
+    def __init__(
+        self,
+        device=None,
+        clock=None,
+        abort_sources=(),
+        budget=None,
+        history_size: int = 32,
+        collector=None,
+    ):
+        super().__init__(device, clock, abort_sources, budget, history_size, collector)
+        self.default_delay_pending = False
+        self.slice_done = False
+        self.task: asyncio.Task | None = None
+
+    async def run(self, ast: list[Stmt], slice_steps: int = Interpreter.SLICE_STEPS):
+        """Run a program, letting the other tasks run every `slice_steps` statements.
+
+        Waits and typing always let them run.
+        """
+        self._start(self._end_slice, slice_steps)
+        self.task = asyncio.current_task()
+        try:
+            await self._execute_block_async(ast)
+        except BaseException:
+            # Aborted, cancelled or failed: never leave keys pressed on the host
+            self.keyboard.release_all()
+            raise
+        finally:
+            self.task = None
+            self._finish()
+
+    def abort(self):
+        """Stop the payload now, even in the middle of a DELAY."""
+        super().abort()
+        if self.task is not None:
+            self.task.cancel()
+
+    def add_tracer(self, tracer: Tracer):
+        """Call the hooks of `tracer` during the next runs."""
+        super().add_tracer(tracer)
+        execute = self._execute_async
+
+        async def execute_traced(node: Stmt):
+            tracer.before_statement(node)
+            if isinstance(node, KEYBOARD_STATEMENTS):
+                keystroke_count = self.keyboard.keystroke_count
+                tracer.before_keystrokes(node)
+                await execute(node)
+                tracer.after_keystrokes(
+                    node, self.keyboard.keystroke_count - keystroke_count
+                )
+            else:
+                if isinstance(node, DelayStmt):
+                    tracer.on_delay(node.value.value)
+                await execute(node)
+            tracer.after_statement(node)
+
+        self._execute_async = execute_traced  # type: ignore[method-assign]
+
+    async def _execute_async(self, node: Stmt):
+        self._step(node)
+        if isinstance(node, IfStmt):
+            await self._execute_if_statement_async(node)
+        elif isinstance(node, WhileStmt):
+            while await self._evaluate_async(node.condition):
+                self.abort_flag.check()
+                await self._execute_block_async(node.body)
+        elif isinstance(node, ExpressionStmt):
+            await self._evaluate_async(node.expression)
+        elif isinstance(node, VarStmt):
+            self._assign(node.name.value, await self._evaluate_async(node.value))
+        elif isinstance(node, StringStmt):
+            self.history.record(node)
+            await self._type(str(node.value.value), self._strokes(node))
+            self._default_delay()
+        elif isinstance(node, StringLnStmt):
+            self.history.record(node)
+            await self._type(str(node.value.value), self._strokes(node), newline=True)
+            self._default_delay()
+        elif isinstance(node, DelayStmt):
+            await self._delay(node.value.value)
+        elif isinstance(node, WaitForLedStmt):
+            await self._execute_wait_for_led_async(node)
+        elif isinstance(node, (RandomCharStmt, RandomCharFromStmt)):
+            string = self._random_string(node)
+            await self._type(string, self.keyboard.compile(string))
+            self._default_delay()
+        elif isinstance(node, KeyPressStmt):
+            # A single keystroke, pressed once it is due
+            await self._next_keystroke()
+            self._dispatch(node)
+        else:
+            self._dispatch(node)
+
+        if self.default_delay_pending:
+            self.default_delay_pending = False
+            await self._delay(self.default_delay)
+        elif self.slice_done:
+            self.slice_done = False
+            await asyncio.sleep(0)
+
+    async def _execute_block_async(self, block: list[Stmt]):
+        for statement in block:
+            await self._execute_async(statement)
+
+    async def _execute_if_statement_async(self, node: IfStmt):
+        if await self._evaluate_async(node.condition):
+            await self._execute_block_async(node.then_block)
+            return
+        for else_if in node.else_if_blocks:
+            if await self._evaluate_async(else_if.condition):
+                await self._execute_block_async(else_if.then_block)
+                return
+        await self._execute_block_async(node.else_block)
+
+    async def _evaluate_async(self, node: Expr):
+        # Only the expressions calling a function need the event loop, the
+        # others are evaluated as usual
+        calls = node.calls
+        if calls is None:
+            calls = node.calls = _calls(node)
+        if not calls:
+            return self._evaluate(node)
+
+        if isinstance(node, Call):
+            self.call_count += 1
+            await self._execute_block_async(self.functions[node.name.value])
+            return None
+        elif isinstance(node, Binary):
+            left = await self._evaluate_async(node.left)
+            right = await self._evaluate_async(node.right)
+            function = node.function
+            if function is None:
+                function = node.function = self._binary_function(node.operator)
+            return function(left, right)
+        elif isinstance(node, Unary):
+            value = await self._evaluate_async(node.right)
+            function = node.function
+            if function is None:
+                function = node.function = self._unary_function(node.operator)
+            return function(value)
+        elif isinstance(node, Assign):
+            value = await self._evaluate_async(node.value)
+            self._assign(node.name.value, value)
+            return value
+        elif isinstance(node, Grouping):
+            return await self._evaluate_async(node.expression)
+
+    async def _execute_wait_for_led_async(self, node: WaitForLedStmt):
+        if node.type.value not in LED_WAITS:
+            raise RuntimeError(f"Unknown LED wait: {node.type.value}")
+        led, state = LED_WAITS[node.type.value]
+        keyboard = self.keyboard
+        if state is None:
+            # A change since the last keyboard command, or since the start of
+            # the wait if there was none yet
+            if keyboard.marked_led_reports < 0:
+                keyboard.mark_leds()
+            while not keyboard.led_changed(led):
+                self.abort_flag.check()
+                await self.clock.sleep_async(self.LED_POLL_INTERVAL)
+            keyboard.mark_leds()
+        else:
+            while keyboard.led_on(led) != state:
+                self.abort_flag.check()
+                await self.clock.sleep_async(self.LED_POLL_INTERVAL)
+        self.scheduler.restart()
+
+    def _end_slice(self):
+        # Awaited by _execute_async once the statement is done
+        self.slice_done = True
+
+    def _default_delay(self):
+        # Awaited by _execute_async once the statement is done
+        self.default_delay_pending = bool(self.default_delay)
+
+    async def _delay(self, milliseconds):
+        deadline = self.scheduler.deadline(milliseconds, self.keyboard.last_report_ns)
+        self.scheduler.idle(deadline)
+        clock = self.clock
+        abort = self.abort_flag
+        # Slept in slices to poll the abort sources, like a blocking DELAY
+        while abort.sources and deadline - clock.monotonic_ns() > ABORT_POLL_NS:
+            await clock.sleep_async(ABORT_POLL_NS / 1_000_000_000)
+            abort.check()
+        await self._sleep_until(deadline)
+        self.scheduler.done(deadline)
+
+    async def _type(self, string: str, strokes: array, newline: bool = False):
+        keyboard = self.keyboard
+        keyboard.mark_leds()
+        keyboard.char_count += len(string)
+        # The collector is not paused, the other tasks allocate between the
+        # keystrokes
+        for keystroke in strokes:
+            await self._press_stroke(keystroke)
+        if newline:
+            await self._press_stroke(keyboard.KEYCODES["ENTER"])
+        keyboard.release_all()
+
+    async def _press_stroke(self, keystroke: int):
+        keyboard = self.keyboard
+        self.abort_flag.check()
+        if keystroke:
+            await self._next_keystroke()
+            keyboard.press_stroke(keystroke)
+        else:
+            keyboard.release_all()
+
+    async def _next_keystroke(self):
+        """Wait for the keyboard to be allowed to press its next keystroke."""
+        # Keystroke intervals are short, they are slept without spinning so
+        # that the other tasks run during them too
+        keyboard = self.keyboard
+        remaining = keyboard.next_keystroke_ns - self.clock.monotonic_ns()
+        if (keyboard.keystroke_interval_ns or keyboard.jitter) and remaining > 0:
+            await self.clock.sleep_async(remaining / 1_000_000_000)
+        else:
+            await asyncio.sleep(0)
+
+    async def _sleep_until(self, deadline_ns: int):
+        # Give the event loop all the wait but the last milliseconds, which are
+        # spun on the clock for precision
+        remaining = deadline_ns - self.clock.monotonic_ns()
+        if remaining > SPIN_NS:
+            await self.clock.sleep_async((remaining - SPIN_NS) / 1_000_000_000)
+        self.clock.sleep_until(deadline_ns)
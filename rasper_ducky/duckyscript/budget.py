@@ -0,0 +1,46 @@
+class BudgetExceeded(RuntimeError):
+    def __init__(self, budget: str, limit: int, line: int):
+        super().__init__(f"{budget} budget of {limit} exceeded at line {line}")
+        self.budget = budget
+        self.limit = limit
+        self.line = line
+
+
+class Budget:
+    """Limits of a payload run, 0 for no limit.
+
+    The budget is polled like an abort source: every few statements, on each
+    loop iteration and keystroke, and during the waits. Going over a limit
+    raises BudgetExceeded with the line being executed.
+    """
+
+    def __init__(
+        self, max_statements: int = 0, max_time_ms: int = 0, max_keystrokes: int = 0
+    ):
+        self.max_statements = max_statements
+        self.max_time_ms = max_time_ms
+        self.max_keystrokes = max_keystrokes
+        self.interpreter = None
+        self.started_ns = 0
+
+    def start(self, interpreter):
+        self.interpreter = interpreter
+        self.started_ns = interpreter.clock.monotonic_ns()
+
+    def triggered(self) -> bool:
+        interpreter = self.interpreter
+        if interpreter is None:
+            return False
+
+        if self.max_statements and interpreter.steps > self.max_statements:
+            raise BudgetExceeded("Statement", self.max_statements, interpreter.line)
+        if (
+            self.max_keystrokes
+            and interpreter.keyboard.keystroke_count > self.max_keystrokes
+        ):
+            raise BudgetExceeded("Keystroke", self.max_keystrokes, interpreter.line)
+        if self.max_time_ms:
+            elapsed_ns = interpreter.clock.monotonic_ns() - self.started_ns
+            if elapsed_ns > self.max_time_ms * 1_000_000:
+                raise BudgetExceeded("Time", self.max_time_ms, interpreter.line)
+        return False
@@ -0,0 +1,72 @@
+from .layout_table import LayoutTable, layout_table
+from .parser import (
+    FunctionStmt,
+    IfStmt,
+    KbdStmt,
+    Literal,
+    RandomCharFromStmt,
+    Stmt,
+    StringLnStmt,
+    StringStmt,
+    WhileStmt,
+)
+
+
+class LayoutChecker:
+    """Checks that every typed literal of a program can be typed on its layout.
+
+    Statements are checked in source order, each one against the layout of the
+    last RD_KBD above it. All the untypeable characters are reported at once,
+    before anything is typed.
+    """
+
+    def __init__(self, platform: str = "win", language: str = "uk"):
+        self.platform = platform
+        self.language = language
+        self.table: LayoutTable | None = layout_table(platform, language)
+        self.errors: list[str] = []
+
+    def check(self, ast: list[Stmt]):
+        self._check_block(ast)
+        if self.errors:
+            raise SyntaxError("\n".join(self.errors))
+
+    def _check_block(self, block: list[Stmt]):
+        for statement in block:
+            self._check(statement)
+
+    def _check(self, node: Stmt):
+        if isinstance(node, (StringStmt, StringLnStmt, RandomCharFromStmt)):
+            self._check_literal(node.value)
+        elif isinstance(node, KbdStmt):
+            self._check_kbd(node)
+        elif isinstance(node, IfStmt):
+            self._check_block(node.then_block)
+            for else_if in node.else_if_blocks:
+                self._check_block(else_if.then_block)
+            self._check_block(node.else_block)
+        elif isinstance(node, (WhileStmt, FunctionStmt)):
+            self._check_block(node.body)
+
+    def _check_kbd(self, node: KbdStmt):
+        self.platform = node.platform.value.lower()
+        self.language = node.language.value.lower()
+        try:
+            self.table = layout_table(self.platform, self.language)
+        except ValueError as error:
+            self.table = None
+            self.errors.append(
+                f"{error} at line {node.platform.line}, column {node.platform.column}"
+            )
+
+    def _check_literal(self, literal: Literal):
+        if self.table is None:
+            return  # The unknown layout is already reported
+
+        for i, char in enumerate(str(literal.value)):
+            if not self.table.can_type(char):
+                self.errors.append(
+                    f"Character {char!r} can't be typed with layout "
+                    f"{self.platform.upper()} {self.language.upper()} "
+                    f"at line {literal.line}, column {literal.column + i}"
+                )
@@ -0,0 +1,54 @@
+import time
+
+# The last nanoseconds before a deadline are spun on the clock, sleep being
+# too coarse for sub-10ms precision
+SPIN_NS = 10_000_000
+
+
+class Clock:
+    """Wall clock used to pace keystrokes and wait during DELAYs."""
+
+    def monotonic_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    async def sleep_async(self, seconds: float):
+        """Sleep while the other asyncio tasks run."""
+        # Imported here, asyncio is only needed by the asynchronous interpreter
+        import asyncio
+
+        await asyncio.sleep(seconds)
+
+    def sleep_until(self, deadline_ns: int):
+        """Sleep until `deadline_ns`, then spin for the last milliseconds."""
+        remaining = deadline_ns - self.monotonic_ns()
+        if remaining > SPIN_NS:
+            self.sleep((remaining - SPIN_NS) / 1_000_000_000)
+        while self.monotonic_ns() < deadline_ns:
+            pass
+
+
+class VirtualClock(Clock):
+    """Clock that only moves when slept on, a DELAY 30000 returns immediately."""
+
+    def __init__(self, now_ns: int = 0):
+        self.now_ns = now_ns
+
+    def monotonic_ns(self) -> int:
+        return self.now_ns
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.now_ns += int(seconds * 1_000_000_000)
+
+    async def sleep_async(self, seconds: float):
+        import asyncio
+
+        self.sleep(seconds)
+        # The time has passed, the other tasks still get their turn
+        await asyncio.sleep(0)
+
+    def sleep_until(self, deadline_ns: int):
+        self.now_ns = max(self.now_ns, deadline_ns)
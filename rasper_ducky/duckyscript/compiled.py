@@ -0,0 +1,112 @@
+import json
+from binascii import crc32
+
+from .lexer import Token
+from .parser import (
+    Assign,
+    Binary,
+    Call,
+    DelayStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    Grouping,
+    IfStmt,
+    KbdStmt,
+    KeyPressStmt,
+    Literal,
+    RandomCharFromStmt,
+    RandomCharStmt,
+    Stmt,
+    StringLnStmt,
+    StringStmt,
+    Unary,
+    Variable,
+    VarStmt,
+    WaitForLedStmt,
+    WhileStmt,
+)
+
+# Bumped whenever the preprocessor, the lexer, the parser or the nodes change,
+# so that the payloads compiled before are compiled again
+COMPILED_VERSION = 1
+
+# Node class: its constructor arguments, stored in this order
+FIELDS = {
+    Token: ("type", "value", "line", "column"),
+    Binary: ("left", "operator", "right"),
+    Unary: ("operator", "right"),
+    Literal: ("value", "line", "column"),
+    Grouping: ("expression",),
+    Variable: ("name",),
+    Call: ("name",),
+    Assign: ("name", "value"),
+    KeyPressStmt: ("keys", "hold", "release"),
+    VarStmt: ("name", "value"),
+    DelayStmt: ("value",),
+    StringStmt: ("value",),
+    StringLnStmt: ("value",),
+    KbdStmt: ("platform", "language"),
+    IfStmt: ("condition", "then_block", "else_if_blocks", "else_block"),
+    WhileStmt: ("condition", "body"),
+    ExpressionStmt: ("expression",),
+    FunctionStmt: ("name", "body"),
+    RandomCharStmt: ("type", "count"),
+    RandomCharFromStmt: ("type", "value"),
+    WaitForLedStmt: ("type",),
+}
+
+CLASSES = {cls.__name__: cls for cls in FIELDS}
+
+
+def source_key(source: str) -> str:
+    """Key of the program compiled from `source` by this version."""
+    return f"rasper-ducky {COMPILED_VERSION} {crc32(source.encode()):08x} {len(source)}"
+
+
+def dump(ast: list[Stmt], source: str, file):
+    """Write the program compiled from `source` to `file`, after its key.
+
+    Each node is stored as a JSON list of its class name, its line and its
+    constructor arguments. The values resolved by the interpreter on the first
+    run are not stored.
+    """
+    file.write(source_key(source) + "\n")
+    json.dump(_encode(ast), file)
+
+
+def load(source: str, file) -> list[Stmt] | None:
+    """Return the program in `file`, None if it wasn't compiled from `source`.
+
+    Files from another version, or left incomplete, count as another source.
+    """
+    if file.readline().rstrip("\n") != source_key(source):
+        return None
+    try:
+        return _decode(json.load(file))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _encode(value):
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    fields = FIELDS.get(type(value))
+    if fields is None:
+        # Value of a literal or of a token
+        return value
+    encoded = [type(value).__name__, value.line]
+    for field in fields:
+        encoded.append(_encode(getattr(value, field)))
+    return encoded
+
+
+def _decode(value):
+    if not isinstance(value, list):
+        return value
+    # A node starts with its class name, a block with its first node
+    if not value or not isinstance(value[0], str):
+        return [_decode(item) for item in value]
+    node = CLASSES[value[0]](*[_decode(item) for item in value[2:]])
+    if value[1]:
+        node.line = value[1]
+    return node
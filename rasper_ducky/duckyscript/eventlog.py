@@ -0,0 +1,58 @@
+import sys
+
+from .clock import SPIN_NS, Clock
+
+
+class EventLog:
+    """Statements run, in a preallocated ring buffer written out during DELAYs.
+
+    Recording a statement only stores its line, its kind and the time, so the
+    log doesn't change the keystroke timing. The records are written to `file`
+    in the DELAYs long enough for it, or by `drain`. A full buffer drops the new
+    records and counts them instead of waiting for the file.
+    """
+
+    def __init__(self, clock: Clock, file=None, capacity: int = 64):
+        self.clock = clock
+        self.file = file or sys.stdout
+        self.capacity = capacity
+        self.lines = [0] * capacity
+        self.kinds: list = [None] * capacity
+        self.times = [0] * capacity
+        self.first = 0
+        self.count = 0
+        self.dropped = 0
+        self.dropped_written = 0
+        self.started_ns = clock.monotonic_ns()
+
+    def record(self, line: int, kind: str):
+        if self.count == self.capacity:
+            self.dropped += 1
+            return
+        i = (self.first + self.count) % self.capacity
+        self.lines[i] = line
+        self.kinds[i] = kind
+        self.times[i] = self.clock.monotonic_ns()
+        self.count += 1
+
+    def drain(self, until_ns: int | None = None):
+        """Write the records, oldest first, stopping at `until_ns` if given.
+
+        Each record is written as "<microseconds since start> <line> <kind>".
+        """
+        clock = self.clock
+        file = self.file
+        while self.count and (until_ns is None or clock.monotonic_ns() < until_ns):
+            i = self.first
+            elapsed_us = (self.times[i] - self.started_ns) // 1000
+            file.write(f"{elapsed_us} {self.lines[i]} {self.kinds[i]}\n")
+            self.kinds[i] = None
+            self.first = (i + 1) % self.capacity
+            self.count -= 1
+        if not self.count and self.dropped > self.dropped_written:
+            file.write(f"{self.dropped - self.dropped_written} records dropped\n")
+            self.dropped_written = self.dropped
+
+    def drain_in_delay(self, deadline_ns: int):
+        # Leave the end of the DELAY to the precise wait
+        self.drain(deadline_ns - SPIN_NS)
@@ -0,0 +1,36 @@
+class ExecutionHistory:
+    """Last statements typed, in a ring buffer of fixed capacity.
+
+    The buffer holds references to the statements of the program, nothing is
+    copied, so a payload typing forever runs in constant memory. A capacity of
+    0 disables the history.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self.nodes: list = [None] * capacity
+        self.next = 0
+        self.count = 0
+
+    def record(self, node):
+        if self.capacity:
+            self.nodes[self.next] = node
+            self.next = (self.next + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+
+    def recent(self) -> list:
+        """The statements recorded, from the oldest to the newest."""
+        start = self.next - self.count
+        return [self.nodes[i] for i in range(start, self.next)]
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.nodes[i] = None
+        self.next = 0
+        self.count = 0
+
+    def dump(self, file):
+        """Write the statements recorded, one per line, from the oldest."""
+        for node in self.recent():
+            file.write(f"line {node.line}: {node}\n")
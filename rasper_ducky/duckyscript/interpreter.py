@@ -1,7 +1,14 @@
-import random
-import time
-
+from .abort import AbortFlag, PayloadAborted
+from .clock import Clock
+from .eventlog import EventLog
+from .history import ExecutionHistory
+from .jitter import Jitter
 from .keyboard import RasperDuckyKeyboard
+from .memory import Collector
+from .profiler import Profiler
+from .randomchars import RandomChars
+from .tracing import KEYBOARD_STATEMENTS, Tracer
+from .scheduler import DelayScheduler, milliseconds_to_ns
 from .parser import (
     KeyPressStmt,
     RandomCharStmt,
@@ -26,9 +33,24 @@ from .parser import (
     Call,
     KbdStmt,
     RandomCharFromStmt,
+    WaitForLedStmt,
 )
 
 
+# LED to watch and state to wait for, None waiting for the LED to change
+LED_WAITS = {
+    "WAIT_FOR_CAPS_ON": (RasperDuckyKeyboard.LED_CAPS_LOCK, True),
+    "WAIT_FOR_CAPS_OFF": (RasperDuckyKeyboard.LED_CAPS_LOCK, False),
+    "WAIT_FOR_CAPS_CHANGE": (RasperDuckyKeyboard.LED_CAPS_LOCK, None),
+    "WAIT_FOR_NUM_ON": (RasperDuckyKeyboard.LED_NUM_LOCK, True),
+    "WAIT_FOR_NUM_OFF": (RasperDuckyKeyboard.LED_NUM_LOCK, False),
+    "WAIT_FOR_NUM_CHANGE": (RasperDuckyKeyboard.LED_NUM_LOCK, None),
+    "WAIT_FOR_SCROLL_ON": (RasperDuckyKeyboard.LED_SCROLL_LOCK, True),
+    "WAIT_FOR_SCROLL_OFF": (RasperDuckyKeyboard.LED_SCROLL_LOCK, False),
+    "WAIT_FOR_SCROLL_CHANGE": (RasperDuckyKeyboard.LED_SCROLL_LOCK, None),
+}
+
+
 class Interpreter:
     BINARY_OPERATORS = {
         Tok.OP_PLUS: lambda l, r: l + r,
@@ -64,17 +86,249 @@ class Interpreter:
         "RANDOM_CHAR": "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%^&*()",
     }
 
-    def __init__(self):
-        self.variables = {}
-        self.functions = {}
-        self.execution_stack = []
-        self.keyboard = RasperDuckyKeyboard("win", "uk")
+    # Seconds between two reads of the host LEDs while waiting for them
+    LED_POLL_INTERVAL = 0.001
+
+    # Statements run between two checkpoints, where the abort sources and the
+    # budget are polled and the host loop gets the CPU back
+    SLICE_STEPS = 100
+
+    def __init__(
+        self,
+        device=None,
+        clock=None,
+        abort_sources=(),
+        budget=None,
+        history_size: int = 32,
+        collector: Collector | None = None,
+    ):
+        self.variables: dict = {}
+        self.functions: dict = {}
+        # Last STRING and STRINGLN statements, to know where a payload stopped
+        self.history = ExecutionHistory(history_size)
+        # HID device and clock are the real ones unless simulated
+        self.device = device
+        self.clock = clock or Clock()
+        # Checked before each statement, the sources are polled during the
+        # loops, the typing and the waits. The budget and the collector are
+        # polled like them.
+        self.budget = budget
+        self.collector = collector
+        sources = list(abort_sources)
+        if budget is not None:
+            sources.append(budget)
+        if collector is not None:
+            sources.append(collector)
+        self.abort_flag = AbortFlag(sources)
+        self.keyboard = RasperDuckyKeyboard(
+            "win", "uk", device, self.clock, self.abort_flag
+        )
+        self.scheduler = DelayScheduler(self.clock, self.abort_flag)
+        if collector is not None:
+            # DELAY deadlines are measured on this clock, simulated or not
+            collector.clock = self.clock
+            self.keyboard.collector = collector
+            self.scheduler.idle_tasks.append(collector.collect_in_delay)
+        self.default_delay = 0
+        # Picks the characters of the RANDOM_* commands, seeded by $_RANDOM_SEED
+        self.random = RandomChars()
+        # Waits between the reports once $_JITTER_ENABLED, drawn again in DELAYs
+        self.jitter = Jitter(self.clock, RandomChars())
+        self.scheduler.idle_tasks.append(self.jitter.refill_in_delay)
+
+        # Statements executed so far, and line of the current one
+        self.steps = 0
+        self.line = 0
+        self.call_count = 0
+        self.started_ns = self.clock.monotonic_ns()
+        self.on_slice = None
+        self.slice_steps = self.SLICE_STEPS
+        self.checkpoint_step = self.SLICE_STEPS
+        self.profiler: Profiler | None = None
+
+    def interpret(self, ast: list[Stmt], on_slice=None, slice_steps: int = SLICE_STEPS):
+        """Run a program.
+
+        `on_slice` is called every `slice_steps` statements, to let a host loop
+        do its other duties while the program runs.
+        """
+        self._start(on_slice, slice_steps)
+        try:
+            for node in ast:
+                self._execute(node)
+        except BaseException:
+            # Aborted, failed or interrupted from the serial console: never
+            # leave keys pressed on the host
+            self.keyboard.release_all()
+            raise
+        finally:
+            self._finish()
+
+    @property
+    def execution_stack(self) -> list:
+        """Text of the last STRING and STRINGLN statements, from the oldest."""
+        return [node.value.value for node in self.history.recent()]
+
+    def stats(self) -> dict:
+        """Counters of the current or last run, readable at any time."""
+        keyboard = self.keyboard
+        scheduler = self.scheduler
+        elapsed_ns = self.clock.monotonic_ns() - self.started_ns
+        # Keystrokes per second outside of the DELAYs
+        active_ns = elapsed_ns - scheduler.slept_ns
+        lateness = scheduler.stats()
+        return {
+            "elapsed_ms": elapsed_ns // 1_000_000,
+            "statements": self.steps,
+            "function_calls": self.call_count,
+            "reports": keyboard.report_count,
+            "characters": keyboard.char_count,
+            "keystrokes": keyboard.keystroke_count,
+            "delays": scheduler.count,
+            "late_delays": scheduler.late_count,
+            "max_delay_lateness_ms": lateness["max_lateness_ms"],
+            "mean_delay_lateness_ms": lateness["mean_lateness_ms"],
+            "delay_requested_ms": scheduler.requested_ns // 1_000_000,
+            "delay_slept_ms": scheduler.slept_ns // 1_000_000,
+            "keystrokes_per_second": (
+                keyboard.keystroke_count * 1_000_000_000 // active_ns
+                if active_ns > 0
+                else 0
+            ),
+        }
+
+    def wait_for_host(self, timeout_ms: int = 3000) -> bool:
+        """Wait for the host to be ready, see RasperDuckyKeyboard.wait_for_host.
+
+        The first DELAY is counted from the end of the wait.
+        """
+        ready = self.keyboard.wait_for_host(timeout_ms)
+        self.scheduler.restart()
+        return ready
+
+    def abort(self):
+        """Stop the payload before its next statement or keystroke."""
+        self.abort_flag.request()
+
+    # The profiler and the tracers wrap the methods of this interpreter only,
+    # an interpreter without them runs the plain methods with no extra check
+
+    def enable_profiler(self) -> Profiler:
+        """Profile the next runs, per line and per FUNCTION."""
+        profiler = self.profiler = Profiler(self.clock)
+        execute = self._execute
+        call = self._execute_function_call
+
+        def execute_profiled(node: Stmt):
+            profiler.enter(f"line {node.line}", self.keyboard.keystroke_count)
+            try:
+                execute(node)
+            finally:
+                profiler.leave(
+                    profiler.line_stats(node.line), self.keyboard.keystroke_count
+                )
+
+        def call_profiled(node: Call):
+            name = node.name.value
+            profiler.enter(f"{name}()", self.keyboard.keystroke_count)
+            try:
+                call(node)
+            finally:
+                profiler.leave(
+                    profiler.function_stats(name), self.keyboard.keystroke_count
+                )
+
+        self._execute = execute_profiled  # type: ignore[method-assign]
+        self._execute_function_call = call_profiled  # type: ignore[method-assign]
+        return profiler
+
+    def add_tracer(self, tracer: Tracer):
+        """Call the hooks of `tracer` during the next runs."""
+        execute = self._execute
+        execute_delay = self._execute_delay
+        default_delay = self._default_delay
 
-    def interpret(self, ast: list[Stmt]):
-        for node in ast:
-            self._execute(node)
+        def execute_traced(node: Stmt):
+            tracer.before_statement(node)
+            if isinstance(node, KEYBOARD_STATEMENTS):
+                keystroke_count = self.keyboard.keystroke_count
+                tracer.before_keystrokes(node)
+                execute(node)
+                tracer.after_keystrokes(
+                    node, self.keyboard.keystroke_count - keystroke_count
+                )
+            else:
+                execute(node)
+            tracer.after_statement(node)
+
+        def execute_delay_traced(node: DelayStmt):
+            tracer.on_delay(node.value.value)
+            execute_delay(node)
+
+        def default_delay_traced():
+            if self.default_delay:
+                tracer.on_delay(self.default_delay)
+            default_delay()
+
+        self._execute = execute_traced  # type: ignore[method-assign]
+        self._execute_delay = execute_delay_traced  # type: ignore[method-assign]
+        self._default_delay = default_delay_traced  # type: ignore[method-assign]
+
+    def enable_log(self, file=None, capacity: int = 64) -> EventLog:
+        """Log the statements run to `file`, stdout by default, during the DELAYs."""
+        log = EventLog(self.clock, file, capacity)
+        step = self._step
+
+        def step_logged(node: Stmt):
+            log.record(node.line, type(node).__name__)
+            step(node)
+
+        self._step = step_logged  # type: ignore[method-assign]
+        self.scheduler.idle_tasks.append(log.drain_in_delay)
+        return log
+
+    def _start(self, on_slice, slice_steps: int):
+        self.started_ns = self.clock.monotonic_ns()
+        self.scheduler.restart()
+        self.on_slice = on_slice
+        self.slice_steps = slice_steps
+        self._plan_checkpoint()
+        if self.budget is not None:
+            self.budget.start(self)
+        if self.collector is not None:
+            self.collector.start()
+
+    def _finish(self):
+        if self.collector is not None:
+            self.collector.stop()
+
+    def _step(self, node: Stmt):
+        self.line = node.line
+        self.steps += 1
+        if self.steps >= self.checkpoint_step:
+            self._checkpoint()
+        elif self.abort_flag.requested:
+            raise PayloadAborted("Payload aborted")
+
+    def _checkpoint(self):
+        self.abort_flag.check()
+        if self.on_slice is not None:
+            self.on_slice()
+        self._plan_checkpoint()
+
+    def _plan_checkpoint(self):
+        self.checkpoint_step = self.steps + self.slice_steps
+        if self.budget is not None and self.budget.max_statements:
+            # Stop right after the last statement of the budget
+            self.checkpoint_step = min(
+                self.checkpoint_step, self.budget.max_statements + 1
+            )
 
     def _execute(self, node: Stmt):
+        self._step(node)
+        self._dispatch(node)
+
+    def _dispatch(self, node: Stmt):
         if isinstance(node, VarStmt):
             self._execute_var_declaration(node)
         elif isinstance(node, IfStmt):
@@ -101,14 +355,33 @@ class Interpreter:
             self._execute_random_char(node)
         elif isinstance(node, RandomCharFromStmt):
             self._execute_random_char_from(node)
+        elif isinstance(node, WaitForLedStmt):
+            self._execute_wait_for_led(node)
         elif isinstance(node, Literal):
             pass  # A literal is a value, nothing to execute
         else:
             raise RuntimeError(f"Unknown node type: {type(node)}")
 
     def _execute_var_declaration(self, node: VarStmt):
-        value = self._evaluate(node.value)
-        self.variables[node.name.value] = value
+        self._assign(node.name.value, self._evaluate(node.value))
+
+    def _assign(self, name: str, value):
+        self.variables[name] = value
+        if name.startswith("$_"):
+            self._apply_setting(name, value)
+
+    def _apply_setting(self, name: str, value):
+        if name == "$_DEFAULT_DELAY":
+            self.default_delay = int(value)
+        elif name == "$_STRING_DELAY":
+            self.keyboard.set_keystroke_delay(int(value))
+        elif name == "$_RANDOM_SEED":
+            self.random.seed(int(value))
+            self.jitter.seed(int(value))
+        elif name == "$_JITTER_ENABLED":
+            self.keyboard.jitter = self.jitter if value else None
+        elif name == "$_JITTER_MAX":
+            self.jitter.set_max(int(value))
 
     def _execute_if_statement(self, node: IfStmt):
         if self._evaluate(node.condition):
@@ -129,20 +402,37 @@ class Interpreter:
 
     def _execute_while_statement(self, node: WhileStmt):
         while self._evaluate(node.condition):
+            self.abort_flag.check()
             self._execute_block(node.body)
 
     def _execute_print_string(self, node: StringStmt):
-        self.execution_stack.append(node.value.value)
-        self.keyboard.type_string(node.value.value)
+        self.history.record(node)
+        self.keyboard.type_string(str(node.value.value), self._strokes(node))
+        self._default_delay()
 
     def _execute_print_stringln(self, node: StringLnStmt):
-        self.execution_stack.append(node.value.value)
-        self.keyboard.type_string(node.value.value)
-        self.keyboard.press_key("ENTER")
-        self.keyboard.release_all()
+        self.history.record(node)
+        self.keyboard.type_line(str(node.value.value), self._strokes(node))
+        self._default_delay()
+
+    def _strokes(self, node: StringStmt | StringLnStmt):
+        keyboard = self.keyboard
+        if node.layout_table is not keyboard.table:
+            # Compiled again only when the layout changes
+            node.strokes = keyboard.compile(str(node.value.value))
+            node.layout_table = keyboard.table
+        return node.strokes
 
     def _execute_delay(self, node: DelayStmt):
-        time.sleep(float(node.value.value) / 1000)
+        duration_ns = node.duration_ns
+        if duration_ns is None:
+            duration_ns = node.duration_ns = milliseconds_to_ns(node.value.value)
+        self.scheduler.wait_ns(duration_ns, self.keyboard.last_report_ns)
+
+    def _default_delay(self):
+        # DEFAULT_DELAY is waited after each keyboard command
+        if self.default_delay:
+            self.scheduler.wait(self.default_delay, self.keyboard.last_report_ns)
 
     def _execute_expression(self, node: Expr):
         self._evaluate(node)
@@ -151,32 +441,71 @@ class Interpreter:
         self.functions[node.name.value] = node.body
 
     def _execute_function_call(self, node: Call):
+        self.call_count += 1
         self._execute_block(self.functions[node.name.value])
 
     def _execute_keypress(self, node: KeyPressStmt):
+        keyboard = self.keyboard
+        if node.keycode_table is not keyboard.KEYCODES:
+            # Resolved again only when the layout changes
+            node.keycodes = keyboard.keycodes([key.value for key in node.keys])
+            node.keycode_table = keyboard.KEYCODES
         if node.release:
-            for key in node.keys:
-                self.keyboard.release_key(key.value)
+            keyboard.release_keycodes(node.keycodes)
         else:
-            for key in node.keys:
-                self.keyboard.press_key(key.value)
+            keyboard.press_keycodes(node.keycodes)
 
         if not node.hold and not node.release:
-            self.keyboard.release_all()
+            keyboard.release_all()
+        self._default_delay()
 
     def _execute_kbd(self, node: KbdStmt):
+        keyboard = self.keyboard
         self.keyboard = RasperDuckyKeyboard(
-            node.platform.value.lower(), node.language.value.lower()
+            node.platform.value.lower(),
+            node.language.value.lower(),
+            self.device,
+            self.clock,
+            self.abort_flag,
         )
+        for name in keyboard.CARRIED_OVER:
+            setattr(self.keyboard, name, getattr(keyboard, name))
 
     def _execute_random_char(self, node: RandomCharStmt):
+        # Random strings are typed once, their keystrokes are not kept
+        self.keyboard.type_string(self._random_string(node))
+        self._default_delay()
+
+    def _execute_random_char_from(self, node: RandomCharFromStmt):
+        self.keyboard.type_string(self._random_string(node))
+        self._default_delay()
+
+    def _random_string(self, node: RandomCharStmt | RandomCharFromStmt) -> str:
+        if isinstance(node, RandomCharFromStmt):
+            return self.random.string(str(node.value.value))
         if node.type.value not in self.RANDOM_CHAR_SETS:
             raise RuntimeError(f"Unknown random character set: {node.type.value}")
-        char_set = self.RANDOM_CHAR_SETS[node.type.value]
-        self.keyboard.type_string(random.choice(char_set))
+        return self.random.string(self.RANDOM_CHAR_SETS[node.type.value], node.count)
 
-    def _execute_random_char_from(self, node: RandomCharFromStmt):
-        self.keyboard.type_string(random.choice(str(node.value.value)))
+    def _execute_wait_for_led(self, node: WaitForLedStmt):
+        if node.type.value not in LED_WAITS:
+            raise RuntimeError(f"Unknown LED wait: {node.type.value}")
+        led, state = LED_WAITS[node.type.value]
+        keyboard = self.keyboard
+        if state is None:
+            # A change since the last keyboard command, or since the start of
+            # the wait if there was none yet
+            if keyboard.marked_led_reports < 0:
+                keyboard.mark_leds()
+            while not keyboard.led_changed(led):
+                self.abort_flag.check()
+                self.clock.sleep(self.LED_POLL_INTERVAL)
+            keyboard.mark_leds()
+        else:
+            while keyboard.led_on(led) != state:
+                self.abort_flag.check()
+                self.clock.sleep(self.LED_POLL_INTERVAL)
+        self.scheduler.restart()
 
     def _evaluate(self, node: Expr):
         if isinstance(node, Binary):
@@ -192,7 +521,7 @@ class Interpreter:
                 raise RuntimeError(f"Undefined variable: {node.name.value}")
         elif isinstance(node, Assign):
             value = self._evaluate(node.value)
-            self.variables[node.name.value] = value
+            self._assign(node.name.value, value)
             return value
         elif isinstance(node, Grouping):
             return self._evaluate(node.expression)
@@ -204,22 +533,31 @@ class Interpreter:
     def _evaluate_expression(self, node: Binary):
         left = self._evaluate(node.left)
         right = self._evaluate(node.right)
-        return self._apply_operator(node.operator, left, right)
+        function = node.function
+        if function is None:
+            function = node.function = self._binary_function(node.operator)
+        return function(left, right)
 
     def _evaluate_unary(self, node: Unary):
         value = self._evaluate(node.right)
-        return self._apply_unary_operator(node.operator, value)
+        function = node.function
+        if function is None:
+            function = node.function = self._unary_function(node.operator)
+        return function(value)
+
+    # Operators are looked up once per node, then their function is called
+    # directly
 
-    def _apply_operator(self, operator: Token, left, right):
+    def _binary_function(self, operator: Token):
         if operator.type in self.BINARY_OPERATORS:
-            return self.BINARY_OPERATORS[operator.type](left, right)
+            return self.BINARY_OPERATORS[operator.type]
         elif operator.value == "=":
-            return right
+            return lambda l, r: r
         else:
             raise RuntimeError(f"Unknown operator: {operator.value}")
 
-    def _apply_unary_operator(self, operator: Token, value):
+    def _unary_function(self, operator: Token):
         if operator.type in self.UNARY_OPERATORS:
-            return self.UNARY_OPERATORS[operator.type](value)
+            return self.UNARY_OPERATORS[operator.type]
         else:
             raise RuntimeError(f"Unknown operator: {operator.value}")
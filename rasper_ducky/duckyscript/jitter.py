@@ -0,0 +1,73 @@
+from array import array
+
+from .clock import SPIN_NS, Clock
+from .randomchars import RandomChars
+
+# Waits drawn ahead, enough for the keystrokes typed between two DELAYs of most
+# payloads
+JITTER_TABLE = 128
+
+# Longest wait, kept in the small integers of CircuitPython once in nanoseconds
+MAX_JITTER_MS = 1000
+
+
+class Jitter:
+    """Random waits of 0 to `max_ms` milliseconds added between the keystrokes.
+
+    The waits are drawn ahead into a table, so that typing only reads the next
+    one. The ones used are drawn again during the DELAYs long enough for it;
+    a payload typing more keystrokes than the table holds in between reuses
+    them.
+    """
+
+    def __init__(
+        self,
+        clock: Clock,
+        random: RandomChars,
+        max_ms: int = 20,
+        size: int = JITTER_TABLE,
+    ):
+        self.clock = clock
+        self.random = random
+        self.offsets = array("I", [0] * size)
+        self.next = 0
+        # Waits read since they were drawn, oldest first ending before `next`
+        self.used = size
+        self.max_ms = 0
+        self.set_max(max_ms)
+
+    def set_max(self, max_ms: int):
+        """Wait at most `max_ms` milliseconds, drawing the whole table again."""
+        if not 0 <= max_ms <= MAX_JITTER_MS:
+            raise ValueError(
+                f"Jitter must be from 0 to {MAX_JITTER_MS} ms, not {max_ms}"
+            )
+        self.max_ms = max_ms
+        self.used = len(self.offsets)
+        self.refill()
+
+    def seed(self, seed: int | None):
+        """Draw the same waits on each run from `seed`, None for random ones."""
+        self.random.seed(seed)
+        self.set_max(self.max_ms)
+
+    def next_ns(self) -> int:
+        """Return the next wait, in nanoseconds."""
+        i = self.next
+        self.next = i + 1 if i + 1 < len(self.offsets) else 0
+        if self.used < len(self.offsets):
+            self.used += 1
+        return self.offsets[i]
+
+    def refill(self, until_ns: int | None = None):
+        """Draw the waits used again, stopping at `until_ns` if given."""
+        clock = self.clock
+        offsets = self.offsets
+        while self.used and (until_ns is None or clock.monotonic_ns() < until_ns):
+            i = (self.next - self.used) % len(offsets)
+            offsets[i] = self.random.below(self.max_ms + 1) * 1_000_000
+            self.used -= 1
+
+    def refill_in_delay(self, deadline_ns: int):
+        # Leave the end of the DELAY to the precise wait
+        self.refill(deadline_ns - SPIN_NS)
@@ -1,107 +1,320 @@
+from array import array
+
 import usb_hid
-from adafruit_hid.keyboard import Keyboard
+from adafruit_hid import find_device
+
+from .abort import AbortFlag
+from .clock import Clock
+from .jitter import Jitter
+from .keys import keycode_table
+from .layout_table import MODIFIER_FIRST, MODIFIER_LAST, layout_table
+from .memory import Collector
+
+# Keycodes a boot keyboard report can hold besides the modifiers
+REPORT_KEYS = 6
+
+# Seconds between two checks of the host while waiting for it
+HOST_POLL_INTERVAL = 0.005
 
 
 # type: ignore
 class RasperDuckyKeyboard:
-    def __init__(self, platform: str, language: str):
+    # Settings and counters kept by the keyboard replacing this one on RD_KBD
+    CARRIED_OVER = (
+        "keystroke_interval_ns",
+        "keystroke_count",
+        "report_count",
+        "char_count",
+        "jitter",
+        "collector",
+        "_led_status",
+        "led_report_count",
+        "marked_led_status",
+        "marked_led_reports",
+    )
+
+    # Bits of the LED output report sent by the host
+    LED_NUM_LOCK = 0x01
+    LED_CAPS_LOCK = 0x02
+    LED_SCROLL_LOCK = 0x04
+    LED_COMPOSE = 0x08
+
+    def __init__(
+        self, platform: str, language: str, device=None, clock=None, abort=None
+    ):
         self.platform = platform
         self.language = language
+        self.clock = clock or Clock()
+        # Checked before each keystroke, so that long strings stop quickly
+        self.abort = abort or AbortFlag()
+
+        self.table = layout_table(platform, language)
+        self.KEYCODES = keycode_table(f"{platform}_{language}", self.table.keycodes)
+
+        self.device = device or find_device(
+            usb_hid.devices, usage_page=0x1, usage=0x06
+        )
+        # Modifier byte, reserved byte, then the pressed keycodes
+        self.report = bytearray(8)
+        self.key_count = 0
+        # Keys pressed, reports sent and characters typed since the start
+        self.keystroke_count = 0
+        self.report_count = 0
+        self.char_count = 0
+        # Last report the host received, a report identical to it is not sent again
+        self.sent_report = bytearray(8)
+        # When the last report was sent, DELAYs are counted from it
+        self.last_report_ns = 0
+
+        # Key presses are paced to reach the target typing speed, whatever the
+        # number of reports they take. 0 sends them as fast as the host takes them.
+        self.keystroke_interval_ns = 0
+        self.next_keystroke_ns = 0
+        # Random wait added to the interval of each keystroke, None for none
+        self.jitter: Jitter | None = None
+        # Collector paused while typing a string, None for none
+        self.collector: Collector | None = None
+
+        self._led_status = 0
+        # LED reports received, and the LEDs and report count at the last
+        # keyboard command, -1 before the first one. WAIT_FOR_*_CHANGE compares
+        # to them, the host may have answered the command before the wait.
+        self.led_report_count = 0
+        self.marked_led_status = 0
+        self.marked_led_reports = -1
 
+        # Send a blank report to start with no key pressed. It fails until the
+        # host has enumerated the keyboard, which wait_for_host waits for.
         try:
-            layout = __import__(f"keyboard_layout_{platform}_{language}")
-            keycode = __import__(f"keycode_{platform}_{language}")
-        except ImportError:
-            raise ValueError(
-                f"Language {language} not supported for platform {platform}"
-            )
-
-        self.kbd = Keyboard(usb_hid.devices)
-        self.layout = layout.KeyboardLayout(self.kbd)
-
-        self.KEYCODES = {
-            "WINDOWS": keycode.Keycode.WINDOWS,
-            "GUI": keycode.Keycode.GUI,
-            "APP": keycode.Keycode.APPLICATION,
-            "MENU": keycode.Keycode.APPLICATION,
-            "SHIFT": keycode.Keycode.SHIFT,
-            "ALT": keycode.Keycode.ALT,
-            "CONTROL": keycode.Keycode.CONTROL,
-            "CTRL": keycode.Keycode.CONTROL,
-            "DOWNARROW": keycode.Keycode.DOWN_ARROW,
-            "DOWN": keycode.Keycode.DOWN_ARROW,
-            "LEFTARROW": keycode.Keycode.LEFT_ARROW,
-            "LEFT": keycode.Keycode.LEFT_ARROW,
-            "RIGHTARROW": keycode.Keycode.RIGHT_ARROW,
-            "RIGHT": keycode.Keycode.RIGHT_ARROW,
-            "UPARROW": keycode.Keycode.UP_ARROW,
-            "UP": keycode.Keycode.UP_ARROW,
-            "BREAK": keycode.Keycode.PAUSE,
-            "PAUSE": keycode.Keycode.PAUSE,
-            "CAPSLOCK": keycode.Keycode.CAPS_LOCK,
-            "DELETE": keycode.Keycode.DELETE,
-            "END": keycode.Keycode.END,
-            "ESC": keycode.Keycode.ESCAPE,
-            "ESCAPE": keycode.Keycode.ESCAPE,
-            "HOME": keycode.Keycode.HOME,
-            "INSERT": keycode.Keycode.INSERT,
-            "NUMLOCK": keycode.Keycode.KEYPAD_NUMLOCK,
-            "PAGEUP": keycode.Keycode.PAGE_UP,
-            "PAGEDOWN": keycode.Keycode.PAGE_DOWN,
-            "PRINTSCREEN": keycode.Keycode.PRINT_SCREEN,
-            "ENTER": keycode.Keycode.ENTER,
-            "SCROLLLOCK": keycode.Keycode.SCROLL_LOCK,
-            "SPACE": keycode.Keycode.SPACE,
-            "TAB": keycode.Keycode.TAB,
-            "BACKSPACE": keycode.Keycode.BACKSPACE,
-            "A": keycode.Keycode.A,
-            "B": keycode.Keycode.B,
-            "C": keycode.Keycode.C,
-            "D": keycode.Keycode.D,
-            "E": keycode.Keycode.E,
-            "F": keycode.Keycode.F,
-            "G": keycode.Keycode.G,
-            "H": keycode.Keycode.H,
-            "I": keycode.Keycode.I,
-            "J": keycode.Keycode.J,
-            "K": keycode.Keycode.K,
-            "L": keycode.Keycode.L,
-            "M": keycode.Keycode.M,
-            "N": keycode.Keycode.N,
-            "O": keycode.Keycode.O,
-            "P": keycode.Keycode.P,
-            "Q": keycode.Keycode.Q,
-            "R": keycode.Keycode.R,
-            "S": keycode.Keycode.S,
-            "T": keycode.Keycode.T,
-            "U": keycode.Keycode.U,
-            "V": keycode.Keycode.V,
-            "W": keycode.Keycode.W,
-            "X": keycode.Keycode.X,
-            "Y": keycode.Keycode.Y,
-            "Z": keycode.Keycode.Z,
-            "F1": keycode.Keycode.F1,
-            "F2": keycode.Keycode.F2,
-            "F3": keycode.Keycode.F3,
-            "F4": keycode.Keycode.F4,
-            "F5": keycode.Keycode.F5,
-            "F6": keycode.Keycode.F6,
-            "F7": keycode.Keycode.F7,
-            "F8": keycode.Keycode.F8,
-            "F9": keycode.Keycode.F9,
-            "F10": keycode.Keycode.F10,
-            "F11": keycode.Keycode.F11,
-            "F12": keycode.Keycode.F12,
-        }
-
-    def type_string(self, string):
-        self.layout.write(string)
-
-    def press_key(self, key: str):
-        self.kbd.press(self.KEYCODES[key])
-    
-    def release_key(self, key: str):
-        self.kbd.release(self.KEYCODES[key])
+            self.device.send_report(self.report)
+        except OSError:
+            pass
+        self.last_report_ns = self.clock.monotonic_ns()
+
+    def wait_for_host(self, timeout_ms: int = 3000) -> bool:
+        """Wait for the host to enumerate the keyboard and send its LED report.
+
+        Return whether the host got there within `timeout_ms`. Hosts sending no
+        LED report when a keyboard is plugged in take the whole timeout.
+        """
+        clock = self.clock
+        deadline = clock.monotonic_ns() + timeout_ms * 1_000_000
+        enumerated = False
+        while True:
+            self.abort.check()
+            if not enumerated:
+                # Reports are refused until the host has configured the device
+                try:
+                    self.device.send_report(self.report)
+                    self.last_report_ns = clock.monotonic_ns()
+                    enumerated = True
+                except OSError:
+                    pass
+            if enumerated:
+                report = self.device.get_last_received_report()
+                if report:
+                    self._led_status = report[0]
+                    self.led_report_count += 1
+                    return True
+            if clock.monotonic_ns() >= deadline:
+                return False
+            clock.sleep(HOST_POLL_INTERVAL)
+
+    def type_string(self, string: str, strokes: array | None = None):
+        """Type `string`, from its keystrokes `strokes` if already compiled."""
+        self._type(string, strokes)
+        self.release_all()
+
+    def type_line(self, string: str, strokes: array | None = None):
+        self._type(string, strokes)
+        self.press_stroke(self.KEYCODES["ENTER"])
+        self.release_all()
+
+    def press_keys(self, *keys: str):
+        self.press_keycodes(self.keycodes(keys))
+
+    def release_keys(self, *keys: str):
+        self.release_keycodes(self.keycodes(keys))
+
+    def keycodes(self, keys) -> bytes:
+        """Return the keycodes of the key names `keys`."""
+        return bytes(self.KEYCODES[key] for key in keys)
+
+    def press_keycodes(self, keycodes: bytes):
+        self.mark_leds()
+        self._pace()
+        for keycode in keycodes:
+            self._add_keycode(keycode)
+        self.keystroke_count += len(keycodes)
+        self._send()
+
+    def release_keycodes(self, keycodes: bytes):
+        self.mark_leds()
+        for keycode in keycodes:
+            self._remove_keycode(keycode)
+        self._send()
 
     def release_all(self):
-        self.kbd.release_all()
+        report = self.report
+        for i in range(len(report)):
+            report[i] = 0
+        self.key_count = 0
+        self._send()
+
+    @property
+    def led_status(self) -> int:
+        """Last LED state reported by the host, as LED_* bits."""
+        # The device only returns a received report once, keep it until the next one
+        report = self.device.get_last_received_report()
+        if report:
+            self._led_status = report[0]
+            self.led_report_count += 1
+        return self._led_status
+
+    def led_on(self, led: int) -> bool:
+        return bool(self.led_status & led)
+
+    def mark_leds(self):
+        """Remember the LEDs, for the next `led_changed` to compare to."""
+        self.marked_led_status = self.led_status
+        self.marked_led_reports = self.led_report_count
+
+    def led_changed(self, led: int) -> bool:
+        """Whether a report from the host changed `led` since the last mark."""
+        status = self.led_status
+        return self.led_report_count != self.marked_led_reports and bool(
+            (status ^ self.marked_led_status) & led
+        )
+
+    def set_rate(self, keys_per_second: int):
+        """Type at most `keys_per_second` keystrokes per second, 0 for no limit."""
+        self.keystroke_interval_ns = (
+            1_000_000_000 // keys_per_second if keys_per_second > 0 else 0
+        )
+
+    def set_keystroke_delay(self, milliseconds: int):
+        """Wait `milliseconds` between each keystroke, 0 for no delay."""
+        self.keystroke_interval_ns = max(0, milliseconds) * 1_000_000
+
+    def _pace(self):
+        interval = self.keystroke_interval_ns
+        if self.jitter is not None:
+            interval += self.jitter.next_ns()
+        if interval:
+            # Sleep until the deadline of this keystroke. The next deadline
+            # follows this one so that late keystrokes catch up, but never by
+            # bursting keystrokes after a stall.
+            now = self.clock.monotonic_ns()
+            if now < self.next_keystroke_ns:
+                self.clock.sleep((self.next_keystroke_ns - now) / 1_000_000_000)
+            else:
+                self.next_keystroke_ns = now
+            self.next_keystroke_ns += interval
+
+    def _send(self):
+        if self.report == self.sent_report:
+            return
+
+        self.device.send_report(self.report)
+        self.report_count += 1
+        self.sent_report[:] = self.report
+        self.last_report_ns = self.clock.monotonic_ns()
+
+    def keystrokes(self, string: str):
+        """Yield the keystrokes typing `string`, 0 standing for a release of all keys.
+
+        A keystroke is the modifier byte shifted left by 8 bits, then the keycode.
+        """
+        stroke = self.table.stroke
+        for char in string:
+            keystroke = stroke(char)
+            if not keystroke:
+                combined = self.table.combined_stroke(char)
+                if not combined:
+                    raise ValueError(f"No keycode available for character {char!r}")
+                # Dead key, then the character it modifies
+                yield combined >> 8
+                yield 0
+                keystroke = stroke(chr(combined & 0xFF))
+            yield keystroke
+
+    def compile(self, string: str) -> array:
+        """Return the keystrokes typing `string`, to type it again with them."""
+        return array("H", self.keystrokes(string))
+
+    def must_release(self, keystroke: int) -> bool:
+        """Whether the keys pressed must be released before pressing `keystroke`."""
+        return bool(self.key_count) and (
+            self.report[0] != keystroke >> 8
+            or self.key_count == REPORT_KEYS
+            or self._is_pressed(keystroke & 0xFF)
+        )
+
+    def press_stroke(self, keystroke: int):
+        # Unpaced consecutive keystrokes stay pressed in the same report as long
+        # as they share their modifiers, so typing "abc" takes 4 reports instead
+        # of 6
+        self._pace()
+        if self.must_release(keystroke):
+            self.release_all()
+
+        self.report[0] = keystroke >> 8
+        self.report[2 + self.key_count] = keystroke & 0xFF
+        self.key_count += 1
+        self.keystroke_count += 1
+        self._send()
+        if self.keystroke_interval_ns or self.jitter is not None:
+            # Paced keystrokes are released at once, a key held until the next
+            # one would be repeated by the host
+            self.release_all()
+
+    def _type(self, string: str, strokes: array | None = None):
+        self.mark_leds()
+        abort = self.abort
+        self.char_count += len(string)
+        if strokes is None:
+            strokes = self.compile(string)
+        collector = self.collector
+        if collector is not None:
+            collector.pause()
+        try:
+            for keystroke in strokes:
+                abort.check()
+                if keystroke:
+                    self.press_stroke(keystroke)
+                else:
+                    self.release_all()
+        finally:
+            if collector is not None:
+                collector.resume()
+
+    def _is_pressed(self, keycode: int) -> bool:
+        report = self.report
+        for i in range(2, 2 + self.key_count):
+            if report[i] == keycode:
+                return True
+        return False
+
+    def _add_keycode(self, keycode: int):
+        if MODIFIER_FIRST <= keycode <= MODIFIER_LAST:
+            self.report[0] |= 1 << (keycode - MODIFIER_FIRST)
+        elif not self._is_pressed(keycode):
+            if self.key_count == REPORT_KEYS:
+                raise ValueError("Trying to press more than six keys at once.")
+            self.report[2 + self.key_count] = keycode
+            self.key_count += 1
+
+    def _remove_keycode(self, keycode: int):
+        if MODIFIER_FIRST <= keycode <= MODIFIER_LAST:
+            self.report[0] &= ~(1 << (keycode - MODIFIER_FIRST))
+            return
+
+        report = self.report
+        for i in range(2, 2 + self.key_count):
+            if report[i] == keycode:
+                # Keep the pressed keycodes contiguous at the start of the report
+                for j in range(i, 1 + self.key_count):
+                    report[j] = report[j + 1]
+                report[1 + self.key_count] = 0
+                self.key_count -= 1
+                return
@@ -0,0 +1,100 @@
+# DuckyScript key names, mapped to the name of the Keycode attribute they press.
+# This is the single source of truth for the key commands: the lexer builds its
+# KEYPRESS keywords from it and the keyboard resolves keycodes through it.
+KEY_NAMES = {
+    "WINDOWS": "WINDOWS",
+    "GUI": "GUI",
+    "APP": "APPLICATION",
+    "MENU": "APPLICATION",
+    "SHIFT": "SHIFT",
+    "ALT": "ALT",
+    "CONTROL": "CONTROL",
+    "CTRL": "CONTROL",
+    "DOWNARROW": "DOWN_ARROW",
+    "DOWN": "DOWN_ARROW",
+    "LEFTARROW": "LEFT_ARROW",
+    "LEFT": "LEFT_ARROW",
+    "RIGHTARROW": "RIGHT_ARROW",
+    "RIGHT": "RIGHT_ARROW",
+    "UPARROW": "UP_ARROW",
+    "UP": "UP_ARROW",
+    "BREAK": "PAUSE",
+    "PAUSE": "PAUSE",
+    "CAPSLOCK": "CAPS_LOCK",
+    "DELETE": "DELETE",
+    "END": "END",
+    "ESCAPE": "ESCAPE",
+    "ESC": "ESCAPE",
+    "HOME": "HOME",
+    "INSERT": "INSERT",
+    "NUMLOCK": "KEYPAD_NUMLOCK",
+    "PAGEUP": "PAGE_UP",
+    "PAGEDOWN": "PAGE_DOWN",
+    "PRINTSCREEN": "PRINT_SCREEN",
+    "ENTER": "ENTER",
+    "SCROLLLOCK": "SCROLL_LOCK",
+    "SPACE": "SPACE",
+    "TAB": "TAB",
+    "BACKSPACE": "BACKSPACE",
+    "F12": "F12",
+    "F11": "F11",
+    "F10": "F10",
+    "F9": "F9",
+    "F8": "F8",
+    "F7": "F7",
+    "F6": "F6",
+    "F5": "F5",
+    "F4": "F4",
+    "F3": "F3",
+    "F2": "F2",
+    "F1": "F1",
+    "A": "A",
+    "B": "B",
+    "C": "C",
+    "D": "D",
+    "E": "E",
+    "F": "F",
+    "G": "G",
+    "H": "H",
+    "I": "I",
+    "J": "J",
+    "K": "K",
+    "L": "L",
+    "M": "M",
+    "N": "N",
+    "O": "O",
+    "P": "P",
+    "Q": "Q",
+    "R": "R",
+    "S": "S",
+    "T": "T",
+    "U": "U",
+    "V": "V",
+    "W": "W",
+    "X": "X",
+    "Y": "Y",
+    "Z": "Z",
+}
+
+# Keycode tables already built, by layout name
+_KEYCODE_TABLES: dict[str, dict[str, int]] = {}
+
+
+def pack_keycodes(keycode) -> bytes:
+    """Pack the keycodes of a keycode module in KEY_NAMES order."""
+    return bytes(
+        getattr(keycode.Keycode, attribute) for attribute in KEY_NAMES.values()
+    )
+
+
+def keycode_table(name: str, keycodes) -> dict[str, int]:
+    """Return the key name to keycode table of a layout from its packed keycodes.
+
+    The table is built on first use and shared by every keyboard using the same
+    layout, so switching back and forth between layouts is free.
+    """
+    table = _KEYCODE_TABLES.get(name)
+    if table is None:
+        table = dict(zip(KEY_NAMES, keycodes))
+        _KEYCODE_TABLES[name] = table
+    return table
@@ -0,0 +1,222 @@
+import os
+import struct
+
+from .keys import pack_keycodes
+
+# HID keycodes of the modifier keys, LEFT_CONTROL to RIGHT_GUI. Each one is a bit
+# of the modifier byte of a keyboard report.
+MODIFIER_FIRST = 0xE0
+MODIFIER_LAST = 0xE7
+
+ASCII_SIZE = 128
+
+# Layout table files: a header, the keycodes in KEY_NAMES order, the ASCII
+# strokes, then the single stroke and the combined (dead key) records, both
+# sorted by codepoint.
+MAGIC = b"RDLT"
+VERSION = 1
+HEADER = "<4sBBHH"  # magic, version, keycode count, single count, combined count
+HEADER_SIZE = struct.calcsize(HEADER)
+SINGLE_SIZE = 4  # codepoint (u16), modifier, keycode
+COMBINED_SIZE = 5  # codepoint (u16), dead key modifier, dead key keycode, next char
+
+LAYOUTS_DIR = "layouts"
+
+
+class LayoutTable:
+    """Precompiled character to keystroke table of a keyboard layout.
+
+    A keystroke is packed as `(modifier << 8) | keycode`, 0 meaning the layout
+    can't type the character in a single stroke. ASCII characters are indexed
+    directly in `ascii`, the other ones are fixed-size records found by binary
+    search. Characters typed with a dead key are in the `combined` records.
+    """
+
+    def __init__(self, keycodes, ascii, singles, combined):
+        self.keycodes = keycodes
+        self.ascii = ascii
+        self.singles = singles
+        self.combined = combined
+
+    @classmethod
+    def from_modules(cls, layout, keycode) -> "LayoutTable":
+        return cls.from_layout(layout.KeyboardLayout(None), pack_keycodes(keycode))
+
+    @classmethod
+    def from_layout(cls, layout, keycodes: bytes = b"") -> "LayoutTable":
+        ascii = bytearray(2 * ASCII_SIZE)
+        for code in range(min(len(layout.ASCII_TO_KEYCODE), ASCII_SIZE)):
+            stroke = cls._compile(layout, chr(code))
+            ascii[2 * code] = stroke >> 8
+            ascii[2 * code + 1] = stroke & 0xFF
+
+        singles = []
+        for char in layout.HIGHER_ASCII:
+            code = char if isinstance(char, int) else ord(char)
+            stroke = cls._compile(layout, chr(code))
+            if stroke and ASCII_SIZE <= code <= 0xFFFF:
+                singles.append(struct.pack("<HBB", code, stroke >> 8, stroke & 0xFF))
+
+        combined = []
+        for char, value in layout.COMBINED_KEYS.items():
+            code = char if isinstance(char, int) else ord(char)
+            if code > 0xFFFF or cls._compile(layout, chr(code)):
+                continue
+            dead_modifier = 0
+            dead_keycode = value >> 8
+            if dead_keycode & layout.SHIFT_FLAG:
+                dead_modifier |= cls._modifier_bit(layout.SHIFT_CODE)
+            if value & layout.ALTGR_FLAG:
+                dead_modifier |= cls._modifier_bit(layout.RIGHT_ALT_CODE)
+            combined.append(
+                struct.pack(
+                    "<HBBB",
+                    code,
+                    dead_modifier,
+                    dead_keycode & ~layout.SHIFT_FLAG & 0xFF,
+                    value & ~layout.ALTGR_FLAG & 0xFF,
+                )
+            )
+
+        return cls(
+            keycodes, ascii, b"".join(sorted(singles)), b"".join(sorted(combined))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LayoutTable":
+        buffer = bytearray(os.stat(path)[6])
+        with open(path, "rb") as file:
+            file.readinto(buffer)
+
+        magic, version, keycode_count, single_count, combined_count = (
+            struct.unpack_from(HEADER, buffer)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported layout table: {path}")
+
+        view = memoryview(buffer)
+        start = HEADER_SIZE
+        keycodes = view[start : start + keycode_count]
+        start += keycode_count
+        ascii = view[start : start + 2 * ASCII_SIZE]
+        start += 2 * ASCII_SIZE
+        singles = view[start : start + single_count * SINGLE_SIZE]
+        start += single_count * SINGLE_SIZE
+        combined = view[start : start + combined_count * COMBINED_SIZE]
+        return cls(keycodes, ascii, singles, combined)
+
+    def to_bytes(self) -> bytes:
+        header = struct.pack(
+            HEADER,
+            MAGIC,
+            VERSION,
+            len(self.keycodes),
+            len(self.singles) // SINGLE_SIZE,
+            len(self.combined) // COMBINED_SIZE,
+        )
+        return (
+            header
+            + bytes(self.keycodes)
+            + bytes(self.ascii)
+            + bytes(self.singles)
+            + bytes(self.combined)
+        )
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    def stroke(self, char: str) -> int:
+        code = ord(char)
+        if code < ASCII_SIZE:
+            return (self.ascii[2 * code] << 8) | self.ascii[2 * code + 1]
+
+        offset = self._search(self.singles, SINGLE_SIZE, code)
+        if offset < 0:
+            return 0
+        return (self.singles[offset + 2] << 8) | self.singles[offset + 3]
+
+    def can_type(self, char: str) -> bool:
+        return bool(self.stroke(char) or self.combined_stroke(char))
+
+    def combined_stroke(self, char: str) -> int:
+        """Return `(dead key stroke << 8) | next char code`, 0 if there is none."""
+        offset = self._search(self.combined, COMBINED_SIZE, ord(char))
+        if offset < 0:
+            return 0
+        records = self.combined
+        return (
+            (records[offset + 2] << 16)
+            | (records[offset + 3] << 8)
+            | records[offset + 4]
+        )
+
+    @staticmethod
+    def _search(records, size: int, code: int) -> int:
+        low = 0
+        high = len(records) // size
+        while low < high:
+            middle = (low + high) // 2
+            offset = middle * size
+            if records[offset] | (records[offset + 1] << 8) < code:
+                low = middle + 1
+            else:
+                high = middle
+        offset = low * size
+        if (
+            offset < len(records)
+            and records[offset] | (records[offset + 1] << 8) == code
+        ):
+            return offset
+        return -1
+
+    @staticmethod
+    def _compile(layout, char: str) -> int:
+        try:
+            keycodes = layout.keycodes(char)
+        except ValueError:
+            return 0
+
+        modifier = 0
+        keycode = 0
+        for code in keycodes:
+            if MODIFIER_FIRST <= code <= MODIFIER_LAST:
+                modifier |= LayoutTable._modifier_bit(code)
+            else:
+                keycode = code
+        return (modifier << 8) | keycode if keycode else 0
+
+    @staticmethod
+    def _modifier_bit(code: int) -> int:
+        return 1 << (code - MODIFIER_FIRST)
+
+
+# Layout tables already loaded, by platform and language
+_LAYOUT_TABLES: dict[str, LayoutTable] = {}
+
+
+def layout_table(platform: str, language: str) -> LayoutTable:
+    """Return the table of a keyboard layout, loaded once per layout.
+
+    The table is read from its compiled file in LAYOUTS_DIR if there is one,
+    otherwise it is compiled from the keyboard_layout_* and keycode_* modules.
+    """
+    name = f"{platform}_{language}"
+    table = _LAYOUT_TABLES.get(name)
+    if table is not None:
+        return table
+
+    try:
+        table = LayoutTable.load(f"{LAYOUTS_DIR}/{name}.rdl")
+    except OSError:
+        try:
+            layout = __import__(f"keyboard_layout_{name}")
+            keycode = __import__(f"keycode_{name}")
+        except ImportError:
+            raise ValueError(
+                f"Language {language} not supported for platform {platform}"
+            )
+        table = LayoutTable.from_modules(layout, keycode)
+
+    _LAYOUT_TABLES[name] = table
+    return table
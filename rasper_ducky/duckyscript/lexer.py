@@ -1,6 +1,11 @@
+from .keys import KEY_NAMES
+
+
 class Tok:
     VAR = "VAR"
     DELAY = "DELAY"
+    DEFAULT_DELAY = "DEFAULT_DELAY"
+    STRING_DELAY = "STRING_DELAY"
     IDENTIFIER = "IDENTIFIER"
     ASSIGN = "ASSIGN"
     SKIP = "SKIP"
@@ -15,6 +20,7 @@ class Tok:
     END_REM_BLOCK = "END_REM_BLOCK"
 
     WAIT_FOR_BUTTON_PRESS = "WAIT_FOR_BUTTON_PRESS"
+    WAIT_FOR_LED = "WAIT_FOR_LED"
     
     HOLD = "HOLD"
     RELEASE = "RELEASE"
@@ -129,11 +135,24 @@ class Lexer:
         "WHILE": Tok.WHILE,
         "END_WHILE": Tok.END_WHILE,
         "DELAY": Tok.DELAY,
+        "DEFAULT_DELAY": Tok.DEFAULT_DELAY,
+        "DEFAULTDELAY": Tok.DEFAULT_DELAY,
+        "STRING_DELAY": Tok.STRING_DELAY,
+        "STRINGDELAY": Tok.STRING_DELAY,
         "STRING": Tok.PRINTSTRING,
         "STRINGLN": Tok.PRINTSTRINGLN,
         "HOLD": Tok.HOLD,
         "RELEASE": Tok.RELEASE,
         "WAIT_FOR_BUTTON_PRESS": Tok.WAIT_FOR_BUTTON_PRESS,
+        "WAIT_FOR_CAPS_ON": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_CAPS_OFF": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_CAPS_CHANGE": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_NUM_ON": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_NUM_OFF": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_NUM_CHANGE": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_SCROLL_ON": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_SCROLL_OFF": Tok.WAIT_FOR_LED,
+        "WAIT_FOR_SCROLL_CHANGE": Tok.WAIT_FOR_LED,
         "RANDOM_LOWERCASE_LETTER": Tok.RANDOM_CHAR,
         "RANDOM_UPPERCASE_LETTER": Tok.RANDOM_CHAR,
         "RANDOM_LETTER": Tok.RANDOM_CHAR,
@@ -153,79 +172,8 @@ class Lexer:
         "REM": Tok.REM,
         "REM_BLOCK": Tok.REM_BLOCK,
         "END_REM": Tok.END_REM_BLOCK,
-        "WINDOWS": Tok.KEYPRESS,
-        "GUI": Tok.KEYPRESS,
-        "APP": Tok.KEYPRESS,
-        "MENU": Tok.KEYPRESS,
-        "SHIFT": Tok.KEYPRESS,
-        "ALT": Tok.KEYPRESS,
-        "CONTROL": Tok.KEYPRESS,
-        "CTRL": Tok.KEYPRESS,
-        "DOWNARROW": Tok.KEYPRESS,
-        "DOWN": Tok.KEYPRESS,
-        "LEFTARROW": Tok.KEYPRESS,
-        "LEFT": Tok.KEYPRESS,
-        "RIGHTARROW": Tok.KEYPRESS,
-        "RIGHT": Tok.KEYPRESS,
-        "UPARROW": Tok.KEYPRESS,
-        "UP": Tok.KEYPRESS,
-        "BREAK": Tok.KEYPRESS,
-        "PAUSE": Tok.KEYPRESS,
-        "CAPSLOCK": Tok.KEYPRESS,
-        "DELETE": Tok.KEYPRESS,
-        "END": Tok.KEYPRESS,
-        "ESCAPE": Tok.KEYPRESS,
-        "ESC": Tok.KEYPRESS,
-        "HOME": Tok.KEYPRESS,
-        "INSERT": Tok.KEYPRESS,
-        "NUMLOCK": Tok.KEYPRESS,
-        "PAGEUP": Tok.KEYPRESS,
-        "PAGEDOWN": Tok.KEYPRESS,
-        "PRINTSCREEN": Tok.KEYPRESS,
-        "ENTER": Tok.KEYPRESS,
-        "SCROLLLOCK": Tok.KEYPRESS,
-        "SPACE": Tok.KEYPRESS,
-        "TAB": Tok.KEYPRESS,
-        "BACKSPACE": Tok.KEYPRESS,
-        "F12": Tok.KEYPRESS,
-        "F11": Tok.KEYPRESS,
-        "F10": Tok.KEYPRESS,
-        "F9": Tok.KEYPRESS,
-        "F8": Tok.KEYPRESS,
-        "F7": Tok.KEYPRESS,
-        "F6": Tok.KEYPRESS,
-        "F5": Tok.KEYPRESS,
-        "F4": Tok.KEYPRESS,
-        "F3": Tok.KEYPRESS,
-        "F2": Tok.KEYPRESS,
-        "F1": Tok.KEYPRESS,
-        "A": Tok.KEYPRESS,
-        "B": Tok.KEYPRESS,
-        "C": Tok.KEYPRESS,
-        "D": Tok.KEYPRESS,
-        "E": Tok.KEYPRESS,
-        "F": Tok.KEYPRESS,
-        "G": Tok.KEYPRESS,
-        "H": Tok.KEYPRESS,
-        "I": Tok.KEYPRESS,
-        "J": Tok.KEYPRESS,
-        "K": Tok.KEYPRESS,
-        "L": Tok.KEYPRESS,
-        "M": Tok.KEYPRESS,
-        "N": Tok.KEYPRESS,
-        "O": Tok.KEYPRESS,
-        "P": Tok.KEYPRESS,
-        "Q": Tok.KEYPRESS,
-        "R": Tok.KEYPRESS,
-        "S": Tok.KEYPRESS,
-        "T": Tok.KEYPRESS,
-        "U": Tok.KEYPRESS,
-        "V": Tok.KEYPRESS,
-        "W": Tok.KEYPRESS,
-        "X": Tok.KEYPRESS,
-        "Y": Tok.KEYPRESS,
-        "Z": Tok.KEYPRESS,
     }
+    KEYWORDS.update(dict.fromkeys(KEY_NAMES, Tok.KEYPRESS))
 
     def __init__(self, code: str):
         self.code = code
@@ -0,0 +1,142 @@
+import gc
+
+from .clock import SPIN_NS, Clock
+
+try:
+    import tracemalloc
+except ImportError:
+    # CircuitPython, the free memory is read from gc instead
+    tracemalloc = None  # type: ignore[assignment]
+
+
+class MemoryReport:
+    """Free memory before each stage of the pipeline and what it allocated.
+
+    On CircuitPython, the heap is collected before each stage and the peak is
+    the memory allocated by the stage until it ends, which misses what was
+    collected during it. On CPython, tracemalloc gives the real peak and the
+    free memory is not known. A stage raising, MemoryError included, is still
+    reported. A disabled report only runs the stages.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # (stage, free bytes before or None, peak bytes, retained bytes, error)
+        self.stages: list[tuple] = []
+
+    def measure(self, stage: str, function, *args):
+        """Return `function(*args)`, recording its memory use as `stage`."""
+        if not self.enabled:
+            return function(*args)
+        if tracemalloc is not None:
+            return self._measure_traced(stage, function, args)
+
+        gc.collect()
+        free = gc.mem_free()
+        error = None
+        try:
+            return function(*args)
+        except BaseException as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            peak = free - gc.mem_free()
+            gc.collect()
+            self.stages.append((stage, free, peak, free - gc.mem_free(), error))
+
+    def _measure_traced(self, stage: str, function, args):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        error = None
+        try:
+            return function(*args)
+        except BaseException as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - before
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - before
+            if started:
+                tracemalloc.stop()
+            self.stages.append((stage, None, peak, retained, error))
+
+    def export_text(self, file):
+        """Write a table of the stages, in bytes, in the order they ran."""
+        file.write(f"{'Stage':<14} {'Free':>9} {'Peak':>9} {'Retained':>9}\n")
+        for stage, free, peak, retained, error in self.stages:
+            free_text = "-" if free is None else str(free)
+            file.write(f"{stage:<14} {free_text:>9} {peak:>9} {retained:>9}")
+            file.write(f" {error}\n" if error else "\n")
+
+
+class Collector:
+    """Runs the garbage collector in the DELAYs instead of in the middle of typing.
+
+    The automatic collection is paused while the keystrokes of a string are
+    typed, and the heap is collected at the start of each DELAY long enough to
+    absorb the last collection time. Everything else, like switching layouts or
+    compiling a string, may still collect when the heap is full. Polled like an
+    abort source, it also collects between two keystrokes when the free memory
+    falls under `low_memory` bytes.
+    """
+
+    # Guess of the collection time until one is measured
+    COLLECT_NS = 20_000_000
+    # Polls between two reads of the free memory, which walk the heap
+    CHECK_EVERY = 32
+
+    def __init__(self, low_memory: int = 16_384, clock: Clock | None = None):
+        self.clock = clock or Clock()
+        self.low_memory = low_memory
+        self.collect_ns = self.COLLECT_NS
+        self.polls = 0
+        self.collections = 0
+        self.forced_collections = 0
+        # CPython has no free memory to check, only the DELAYs are used there
+        self.mem_free = getattr(gc, "mem_free", None)
+
+    def start(self):
+        gc.enable()
+
+    def stop(self):
+        gc.enable()
+
+    def pause(self):
+        """Stop collecting automatically, until `resume`.
+
+        A heap with less than twice `low_memory` free is collected first, so
+        that a string is typed before reaching `low_memory`: a full heap would
+        raise MemoryError instead of being collected.
+        """
+        if self.mem_free is not None and self.mem_free() < 2 * self.low_memory:
+            self.forced_collections += 1
+            self.collect()
+        gc.disable()
+
+    def resume(self):
+        gc.enable()
+
+    def triggered(self) -> bool:
+        self.polls += 1
+        if (
+            self.mem_free is not None
+            and self.polls % self.CHECK_EVERY == 0
+            and self.mem_free() < self.low_memory
+        ):
+            self.forced_collections += 1
+            self.collect()
+        return False
+
+    def collect_in_delay(self, deadline_ns: int):
+        if deadline_ns - self.clock.monotonic_ns() > self.collect_ns + SPIN_NS:
+            self.collect()
+
+    def collect(self):
+        start = self.clock.monotonic_ns()
+        gc.collect()
+        self.collect_ns = self.clock.monotonic_ns() - start
+        self.collections += 1
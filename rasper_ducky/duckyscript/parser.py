@@ -1,13 +1,23 @@
+from array import array
+
 from .lexer import Tok, Token
 
 
 # EXPRESSIONS
 class Expr:
+    line = 0
+    # Whether the expression calls a function, resolved by the asynchronous
+    # interpreter on first evaluation
+    calls: bool | None = None
+
     def __eq__(self, other):
         return self.__repr__() == other.__repr__()
 
 
 class Binary(Expr):
+    # Function of the operator, resolved by the interpreter on first evaluation
+    function = None
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
@@ -18,6 +28,8 @@ class Binary(Expr):
 
 
 class Unary(Expr):
+    function = None
+
     def __init__(self, operator: Token, right: Expr):
         self.operator = operator
         self.right = right
@@ -27,8 +39,10 @@ class Unary(Expr):
 
 
 class Literal(Expr):
-    def __init__(self, value: bool | int | str):
+    def __init__(self, value: bool | int | str, line: int = 0, column: int = 0):
         self.value = value
+        self.line = line
+        self.column = column
 
     def __repr__(self):
         return f"LITERAL({self.value})"
@@ -69,11 +83,18 @@ class Assign(Expr):
 
 # STATEMENTS
 class Stmt:
+    # Line of the statement in the source, set by the parser
+    line = 0
+
     def __eq__(self, other):
         return self.__repr__() == other.__repr__()
 
 
 class KeyPressStmt(Stmt):
+    # Keycodes of the keys, resolved by the interpreter for a keycode table
+    keycodes = b""
+    keycode_table: dict | None = None
+
     def __init__(self, keys: list[Token], hold: bool = False, release: bool = False):
         self.keys = keys
         self.hold = hold
@@ -93,6 +114,9 @@ class VarStmt(Stmt):
 
 
 class DelayStmt(Stmt):
+    # Duration in nanoseconds, converted by the interpreter on first run
+    duration_ns: int | None = None
+
     def __init__(self, value: Literal):
         self.value = value
 
@@ -101,6 +125,10 @@ class DelayStmt(Stmt):
 
 
 class StringStmt(Stmt):
+    # Keystrokes of the string, compiled by the interpreter for a layout table
+    strokes: array | None = None
+    layout_table: object | None = None
+
     def __init__(self, value: Literal):
         self.value = value
 
@@ -109,6 +137,10 @@ class StringStmt(Stmt):
 
 
 class StringLnStmt(Stmt):
+    # Keystrokes of the string, compiled by the interpreter for a layout table
+    strokes: array | None = None
+    layout_table: object | None = None
+
     def __init__(self, value: Literal):
         self.value = value
 
@@ -169,11 +201,14 @@ class FunctionStmt(Stmt):
 
 
 class RandomCharStmt(Stmt):
-    def __init__(self, type: Token):
+    def __init__(self, type: Token, count: int = 1):
         self.type = type
+        self.count = count
 
     def __repr__(self):
-        return f"RANDOM_CHAR({self.type})"
+        if self.count == 1:
+            return f"RANDOM_CHAR({self.type})"
+        return f"RANDOM_CHAR({self.type}, {self.count})"
 
 
 class RandomCharFromStmt(Stmt):
@@ -185,6 +220,14 @@ class RandomCharFromStmt(Stmt):
         return f"RANDOM_CHAR_FROM({self.type}, {self.value})"
 
 
+class WaitForLedStmt(Stmt):
+    def __init__(self, type: Token):
+        self.type = type
+
+    def __repr__(self):
+        return f"WAIT_FOR_LED({self.type})"
+
+
 class Parser:
     def __init__(self, tokens: list[Token]):
         self.tokens = tokens
@@ -197,9 +240,10 @@ class Parser:
         return statements
 
     def declaration(self) -> Stmt:
-        if self.match(Tok.VAR):
-            return self.var_stmt()
-        return self.statement()
+        line = self.peek().line
+        statement = self.var_stmt() if self.match(Tok.VAR) else self.statement()
+        statement.line = line
+        return statement
 
     def statement(self) -> Stmt:
         if self.match(Tok.VAR):
@@ -212,6 +256,8 @@ class Parser:
             return self.kbd_stmt()
         elif self.match(Tok.DELAY):
             return self.delay_stmt()
+        elif self.match(Tok.DEFAULT_DELAY, Tok.STRING_DELAY):
+            return self.delay_setting_stmt()
         elif self.match(Tok.IF):
             return self.if_stmt()
         elif self.match(Tok.WHILE):
@@ -226,6 +272,8 @@ class Parser:
             return self.random_char_stmt()
         elif self.match(Tok.RANDOM_CHAR_FROM):
             return self.random_char_from_stmt()
+        elif self.match(Tok.WAIT_FOR_LED):
+            return self.wait_for_led_stmt()
 
         return self.expression_stmt()
 
@@ -259,12 +307,12 @@ class Parser:
     def string_stmt(self) -> StringStmt:
         value = self.consume(Tok.STRING, "Expected a string after STRING")
         self.consume_termination("Expected a line break after a string")
-        return StringStmt(Literal(value.value))
+        return StringStmt(Literal(value.value, value.line, value.column))
 
     def stringln_stmt(self) -> StringLnStmt:
         value = self.consume(Tok.STRING, "Expected a string after STRINGLN")
         self.consume_termination("Expected a line break after a string")
-        return StringLnStmt(Literal(value.value))
+        return StringLnStmt(Literal(value.value, value.line, value.column))
 
     def kbd_stmt(self) -> KbdStmt:
         platform = self.consume(Tok.RD_KBD_PLATFORM, "Expected a platform after RD_KBD")
@@ -279,6 +327,15 @@ class Parser:
         self.consume_termination("Expected a line break after a delay duration")
         return DelayStmt(Literal(value.value))
 
+    def delay_setting_stmt(self) -> VarStmt:
+        # DEFAULT_DELAY and STRING_DELAY set the $_DEFAULT_DELAY and
+        # $_STRING_DELAY internal variables
+        setting = self.previous()
+        value = self.consume(Tok.NUMBER, f"Expected a number after {setting.value}")
+        self.consume_termination(f"Expected a line break after '{setting.value}'")
+        name = Token(Tok.IDENTIFIER, f"$_{setting.type}", setting.line, setting.column)
+        return VarStmt(name, Literal(value.value))
+
     def if_stmt(self) -> IfStmt:
         condition = self.expression()
         self.consume(Tok.THEN, "Expected 'THEN'")
@@ -321,14 +378,28 @@ class Parser:
 
     def random_char_stmt(self) -> RandomCharStmt:
         type = self.previous()
+        # An optional count types that many characters at once
+        count = 1
+        if self.match(Tok.NUMBER):
+            number = self.previous()
+            if not number.value.isdigit():
+                raise self.error(number, "Expected a whole number of characters")
+            count = int(number.value)
         self.consume_termination(f"Expected a line break after '{type.value}'")
-        return RandomCharStmt(type)
+        return RandomCharStmt(type, count)
 
     def random_char_from_stmt(self) -> RandomCharFromStmt:
         type = self.previous()
         value = self.consume(Tok.STRING, "Expected a string after 'RANDOM_CHAR_FROM'")
         self.consume_termination(f"Expected a line break after '{type.value}'")
-        return RandomCharFromStmt(type, Literal(value.value))
+        return RandomCharFromStmt(
+            type, Literal(value.value, value.line, value.column)
+        )
+
+    def wait_for_led_stmt(self) -> WaitForLedStmt:
+        type = self.previous()
+        self.consume_termination(f"Expected a line break after '{type.value}'")
+        return WaitForLedStmt(type)
 
     def block(self) -> list[Stmt]:
         statements = []
@@ -340,7 +411,7 @@ class Parser:
             and not self.check(Tok.END_FUNCTION)
             and not self.is_at_end()
         ):
-            statements.append(self.statement())
+            statements.append(self.declaration())
         return statements
 
     def expression_stmt(self) -> ExpressionStmt:
@@ -434,7 +505,9 @@ class Parser:
         if self.match(Tok.TRUE):
             return Literal(True)
         if self.match(Tok.NUMBER):
-            return Literal(self.previous().value)
+            # Integers are converted once here rather than on each evaluation
+            value = self.previous().value
+            return Literal(int(value) if value.isdigit() else value)
         if self.match(Tok.STRING):
             return Literal(self.previous().value)
         if self.match(Tok.IDENTIFIER):
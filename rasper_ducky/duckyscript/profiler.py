@@ -0,0 +1,80 @@
+from .clock import Clock
+
+# Frame at the bottom of every collapsed stack
+ROOT_FRAME = "payload"
+
+
+class Profiler:
+    """Execution count, time and keystrokes per source line and per FUNCTION.
+
+    Times and keystrokes are inclusive: the line of a WHILE or of a function call
+    counts everything run by its body. The collapsed stacks only count the time
+    spent in each frame itself, as flame graphs expect.
+    """
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        # Line or function name: [count, nanoseconds, keystrokes]
+        self.lines: dict[int, list[int]] = {}
+        self.functions: dict[str, list[int]] = {}
+        # Collapsed stack: nanoseconds spent in its last frame
+        self.stacks: dict[str, int] = {}
+
+        self.frames = [ROOT_FRAME]
+        self.starts: list[int] = []
+        self.children_ns = [0]
+        self.keystrokes: list[int] = []
+
+    def enter(self, frame: str, keystroke_count: int):
+        self.frames.append(frame)
+        self.children_ns.append(0)
+        self.keystrokes.append(keystroke_count)
+        self.starts.append(self.clock.monotonic_ns())
+
+    def leave(self, stats: list[int], keystroke_count: int):
+        elapsed = self.clock.monotonic_ns() - self.starts.pop()
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += keystroke_count - self.keystrokes.pop()
+
+        stack = ";".join(self.frames)
+        self.stacks[stack] = (
+            self.stacks.get(stack, 0) + elapsed - self.children_ns.pop()
+        )
+        self.frames.pop()
+        self.children_ns[-1] += elapsed
+
+    def line_stats(self, line: int) -> list[int]:
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = [0, 0, 0]
+        return stats
+
+    def function_stats(self, name: str) -> list[int]:
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = [0, 0, 0]
+        return stats
+
+    def export_text(self, file):
+        """Write a table of the lines, then of the functions, by line and by name."""
+        file.write(f"{'Line':>6} {'Count':>8} {'Time (ms)':>12} {'Keystrokes':>11}\n")
+        for line in sorted(self.lines):
+            self._write_row(file, f"{line:>6}", self.lines[line])
+        if self.functions:
+            file.write(
+                f"\n{'Function':<20} {'Calls':>8} {'Time (ms)':>12} {'Keystrokes':>11}\n"
+            )
+            for name in sorted(self.functions):
+                self._write_row(file, f"{name + '()':<20}", self.functions[name])
+
+    def export_collapsed(self, file):
+        """Write the collapsed stacks, in microseconds, for flame graph tools."""
+        for stack in sorted(self.stacks):
+            file.write(f"{stack} {self.stacks[stack] // 1000}\n")
+
+    def _write_row(self, file, label: str, stats: list[int]):
+        count, elapsed, keystrokes = stats
+        file.write(
+            f"{label} {count:>8} {elapsed / 1_000_000:>12.3f} {keystrokes:>11}\n"
+        )
@@ -0,0 +1,86 @@
+import os
+
+# Random bytes drawn at once
+BATCH = 64
+
+
+class RandomChars:
+    """Random characters of a set, picked from batches of random bytes.
+
+    Each set is turned once into a table repeating its characters as many
+    times as fit in the 256 values of a byte, and the bytes past the table are
+    drawn again, so every character is as likely. The bytes come from
+    os.urandom, or with a seed from a xorshift generator typing the same
+    characters on the computer and on the device.
+    """
+
+    def __init__(self, seed: int | None = None):
+        self.pool = bytearray(BATCH)
+        self.next = BATCH
+        self.state: int | None = None
+        # Character set: its table
+        self.tables: dict[str, str] = {}
+        self.seed(seed)
+
+    def seed(self, seed: int | None):
+        """Draw the same characters on each run from `seed`, None for random ones."""
+        # The xorshift state must not be 0
+        self.state = None if seed is None else (seed & 0xFFFFFFFF) or 1
+        self.next = BATCH
+
+    def string(self, chars: str, count: int = 1) -> str:
+        """Return `count` characters picked from `chars`."""
+        table = self.tables.get(chars)
+        if table is None:
+            if not chars:
+                raise ValueError("No characters to pick a random one from")
+            # Sets over 256 characters use two bytes per pick instead
+            table = chars if len(chars) > 256 else chars * (256 // len(chars))
+            self.tables[chars] = table
+
+        size = len(table)
+        wide = size > 256
+        limit = 65536 - 65536 % size if wide else size
+        picked: list[str] = []
+        while len(picked) < count:
+            value = self._byte()
+            if wide:
+                value = (value << 8) | self._byte()
+            if value < limit:
+                picked.append(table[value % size])
+        return "".join(picked)
+
+    def below(self, n: int) -> int:
+        """Return a number from 0 to `n` - 1, `n` being at most 65536."""
+        wide = n > 256
+        limit = 65536 - 65536 % n if wide else 256 - 256 % n
+        while True:
+            value = self._byte()
+            if wide:
+                value = (value << 8) | self._byte()
+            if value < limit:
+                return value % n
+
+    def _byte(self) -> int:
+        if self.next == BATCH:
+            self._refill()
+        byte = self.pool[self.next]
+        self.next += 1
+        return byte
+
+    def _refill(self):
+        pool = self.pool
+        state = self.state
+        if state is None:
+            pool[:] = os.urandom(BATCH)
+        else:
+            for i in range(0, BATCH, 4):
+                state ^= (state << 13) & 0xFFFFFFFF
+                state ^= state >> 17
+                state ^= (state << 5) & 0xFFFFFFFF
+                pool[i] = state & 0xFF
+                pool[i + 1] = (state >> 8) & 0xFF
+                pool[i + 2] = (state >> 16) & 0xFF
+                pool[i + 3] = state >> 24
+            self.state = state
+        self.next = 0
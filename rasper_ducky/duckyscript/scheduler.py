@@ -0,0 +1,107 @@
+from .abort import AbortFlag
+from .clock import Clock
+
+# A DELAY ending later than this after its deadline counts as late
+LATE_NS = 1_000_000
+
+# Long DELAYs are slept in slices this long, to poll the abort sources
+ABORT_POLL_NS = 5_000_000
+
+
+def milliseconds_to_ns(milliseconds) -> int:
+    """Convert a DELAY duration like "1500" or "2.5" to nanoseconds, without floats."""
+    if isinstance(milliseconds, int):
+        return milliseconds * 1_000_000
+    whole, _, fraction = str(milliseconds).partition(".")
+    return int(whole or 0) * 1_000_000 + int((fraction + "000000")[:6])
+
+
+class DelayScheduler:
+    """Waits DELAYs on absolute deadlines, so that execution time doesn't add up.
+
+    A DELAY ends its duration after the later of the end of the previous DELAY
+    or wait for the host, and the last report seen by the host. The time spent
+    interpreting in between is taken out of the wait, while the host still gets
+    the full delay after the last keystroke. A DELAY reached after its deadline
+    returns immediately and its lateness is recorded.
+    """
+
+    def __init__(self, clock: Clock, abort: AbortFlag | None = None):
+        self.clock = clock
+        self.abort = abort or AbortFlag()
+        self.deadline_ns = clock.monotonic_ns()
+        # Called with the deadline at the start of each DELAY, to do some
+        # background work in it
+        self.idle_tasks: list = []
+
+        self.count = 0
+        # Time asked for by the DELAYs, and time actually slept in them
+        self.requested_ns = 0
+        self.slept_ns = 0
+        self.wait_start_ns = 0
+        self.late_count = 0
+        self.total_lateness_ns = 0
+        self.max_lateness_ns = 0
+
+    def wait(self, milliseconds, last_report_ns: int = 0):
+        self.wait_ns(milliseconds_to_ns(milliseconds), last_report_ns)
+
+    def wait_ns(self, duration_ns: int, last_report_ns: int = 0):
+        clock = self.clock
+        abort = self.abort
+        deadline = self._deadline(duration_ns, last_report_ns)
+        self.idle(deadline)
+        while abort.sources and deadline - clock.monotonic_ns() > ABORT_POLL_NS:
+            clock.sleep(ABORT_POLL_NS / 1_000_000_000)
+            abort.check()
+        if clock.monotonic_ns() < deadline:
+            clock.sleep_until(deadline)
+        self.done(deadline)
+
+    def deadline(self, milliseconds, last_report_ns: int = 0) -> int:
+        """Deadline of a DELAY of `milliseconds` starting now."""
+        return self._deadline(milliseconds_to_ns(milliseconds), last_report_ns)
+
+    def _deadline(self, duration_ns: int, last_report_ns: int) -> int:
+        self.requested_ns += duration_ns
+        self.wait_start_ns = self.clock.monotonic_ns()
+        return max(self.deadline_ns, last_report_ns) + duration_ns
+
+    def restart(self):
+        """Count the next DELAY from now, after a wait that wasn't a DELAY.
+
+        Only the time spent interpreting is taken out of a DELAY, not the time
+        spent waiting for the host.
+        """
+        self.deadline_ns = self.clock.monotonic_ns()
+
+    def idle(self, deadline: int):
+        """Run the idle tasks in the DELAY until `deadline`."""
+        for task in self.idle_tasks:
+            task(deadline)
+
+    def done(self, deadline: int):
+        """Record the end of the DELAY until `deadline`."""
+        now = self.clock.monotonic_ns()
+        lateness = max(0, now - deadline)
+        self.count += 1
+        self.slept_ns += now - self.wait_start_ns
+        self.total_lateness_ns += lateness
+        self.max_lateness_ns = max(self.max_lateness_ns, lateness)
+        if lateness > LATE_NS:
+            self.late_count += 1
+            # Count the next DELAY from now, never shorten it to catch up
+            self.deadline_ns = now
+        else:
+            self.deadline_ns = deadline
+
+    def stats(self) -> dict:
+        """Lateness of the DELAYs waited so far, in milliseconds."""
+        return {
+            "delays": self.count,
+            "late": self.late_count,
+            "max_lateness_ms": self.max_lateness_ns / 1_000_000,
+            "mean_lateness_ms": (
+                self.total_lateness_ns / self.count / 1_000_000 if self.count else 0
+            ),
+        }
@@ -0,0 +1,95 @@
+from .clock import VirtualClock
+from .interpreter import Interpreter
+from .layout_table import ASCII_SIZE, SINGLE_SIZE, layout_table
+from .parser import Stmt
+
+# Lock keycodes and the bit of the LED they toggle on the host
+LOCK_KEYS = {0x53: 0x01, 0x39: 0x02, 0x47: 0x04}  # NUM, CAPS and SCROLL LOCK
+
+
+class SimulatedDevice:
+    """HID keyboard device recording every report with its virtual timestamp.
+
+    It also plays the host: pressing a lock key toggles the matching LED, which
+    is reported back `host_latency_ms` later.
+    """
+
+    usage_page = 0x01
+    usage = 0x06
+
+    def __init__(self, clock: VirtualClock, host_latency_ms: int = 10):
+        self.clock = clock
+        self.host_latency_ns = host_latency_ms * 1_000_000
+        self.events: list[tuple[int, bytes]] = []
+        self.leds = 0
+        self.led_reports: list[tuple[int, int]] = []
+
+    def send_report(self, report: bytearray, report_id: int | None = None):
+        now = self.clock.monotonic_ns()
+        previous = self.events[-1][1] if self.events else bytes(8)
+        self.events.append((now, bytes(report)))
+
+        for keycode in report[2:]:
+            if keycode in LOCK_KEYS and keycode not in previous[2:]:
+                self.leds ^= LOCK_KEYS[keycode]
+                self.led_reports.append((now + self.host_latency_ns, self.leds))
+
+    def get_last_received_report(self, report_id: int | None = None) -> bytes | None:
+        report = None
+        now = self.clock.monotonic_ns()
+        while self.led_reports and self.led_reports[0][0] <= now:
+            report = bytes([self.led_reports.pop(0)[1]])
+        return report
+
+    def keystrokes(self) -> list[tuple[int, int, int]]:
+        """Return the (timestamp, modifier, keycode) of every key press."""
+        keystrokes = []
+        previous = bytes(8)
+        for timestamp, report in self.events:
+            for keycode in report[2:]:
+                if keycode and keycode not in previous[2:]:
+                    keystrokes.append((timestamp, report[0], keycode))
+            previous = report
+        return keystrokes
+
+    def typed(self, platform: str = "win", language: str = "uk") -> str:
+        """Return the characters typed, as the host would read them with a layout.
+
+        Keystrokes that are not a character of the layout, like key
+        combinations, are left out.
+        """
+        table = layout_table(platform, language)
+        chars: dict[int, str] = {}
+        for code in range(ASCII_SIZE):
+            chars.setdefault(table.stroke(chr(code)), chr(code))
+        for offset in range(0, len(table.singles), SINGLE_SIZE):
+            code = table.singles[offset] | (table.singles[offset + 1] << 8)
+            chars.setdefault(table.stroke(chr(code)), chr(code))
+        chars.pop(0, None)
+
+        return "".join(
+            chars.get((modifier << 8) | keycode, "")
+            for _, modifier, keycode in self.keystrokes()
+        )
+
+    def export(self, file):
+        """Write the trace, one report per line: time in ms then the report bytes."""
+        for timestamp, report in self.events:
+            file.write(f"{timestamp / 1_000_000:.3f} {report.hex(' ')}\n")
+
+
+class Simulation:
+    """Runs programs against a simulated keyboard with a virtual clock."""
+
+    def __init__(self, host_latency_ms: int = 10):
+        self.clock = VirtualClock()
+        self.device = SimulatedDevice(self.clock, host_latency_ms)
+        self.interpreter = Interpreter(self.device, self.clock)
+
+    def run(self, ast: list[Stmt]) -> SimulatedDevice:
+        self.interpreter.interpret(ast)
+        return self.device
+
+    @property
+    def elapsed_ms(self) -> float:
+        return self.clock.monotonic_ns() / 1_000_000
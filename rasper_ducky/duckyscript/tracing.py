@@ -0,0 +1,39 @@
+from .parser import (
+    KeyPressStmt,
+    RandomCharFromStmt,
+    RandomCharStmt,
+    Stmt,
+    StringLnStmt,
+    StringStmt,
+)
+
+# Statements typing on the keyboard, traced as a batch of keystrokes
+KEYBOARD_STATEMENTS = (
+    StringStmt,
+    StringLnStmt,
+    KeyPressStmt,
+    RandomCharStmt,
+    RandomCharFromStmt,
+)
+
+
+class Tracer:
+    """Hooks called while a payload runs, for progress bars, logs or audits.
+
+    Override the hooks needed and add the tracer with `Interpreter.add_tracer`.
+    """
+
+    def before_statement(self, node: Stmt):
+        pass
+
+    def after_statement(self, node: Stmt):
+        pass
+
+    def before_keystrokes(self, node: Stmt):
+        pass
+
+    def after_keystrokes(self, node: Stmt, keystrokes: int):
+        pass
+
+    def on_delay(self, milliseconds):
+        pass
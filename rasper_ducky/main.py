@@ -1,27 +1,98 @@
+import os
+import sys
 import time
 
+import board
+from duckyscript import compiled
+from duckyscript.abort import AbortButton
+from duckyscript.checker import LayoutChecker
 from duckyscript.lexer import Lexer
+from duckyscript.memory import Collector, MemoryReport
 from duckyscript.parser import Parser
 from duckyscript.interpreter import Interpreter
 from duckyscript.preprocessor import Preprocessor
 
-# sleep at the start to allow the device to be recognized by the host computer
-time.sleep(0.5)
+# Longest wait for the host to be ready to receive keystrokes
+HOST_TIMEOUT_MS = int(os.getenv("RASPER_DUCKY_HOST_TIMEOUT_MS", "3000"))
 
+# Compiled payload, loaded instead of compiling payload.dd while up to date
+COMPILED_PATH = "payload.dd.compiled"
 
-def execute(code: str):
+
+def compile_payload(code: str, memory: MemoryReport) -> list:
     preprocessor = Preprocessor()
-    code = preprocessor.process(code)
+    code = memory.measure("Preprocessor", preprocessor.process, code)
     lexer = Lexer(code)
-    tokens = list(lexer.tokenize())
+    tokens = memory.measure("Lexer", list, lexer.tokenize())
     parser = Parser(tokens)
-    ast = parser.parse()
-    interpreter = Interpreter()
-    interpreter.interpret(ast)
+    ast = memory.measure("Parser", parser.parse)
+    LayoutChecker().check(ast)
+    return ast
+
+
+def load_payload(code: str, memory: MemoryReport) -> tuple[list, bool]:
+    """Return the program of `code` and whether it was compiled before."""
+    try:
+        with open(COMPILED_PATH, "r") as file:
+            ast = memory.measure("Loader", compiled.load, code, file)
+        if ast is not None:
+            return ast, True
+    except OSError:
+        pass  # Not compiled yet
+    ast = compile_payload(code, memory)
+    try:
+        with open(COMPILED_PATH, "w") as file:
+            compiled.dump(ast, code, file)
+    except OSError:
+        # Read-only while the host sees the USB drive, see boot.py
+        pass
+    return ast, False
+
+
+def execute(code: str, memory: MemoryReport):
+    start_ns = time.monotonic_ns()
+    ast, cached = load_payload(code, memory)
+    load_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+    # Pressing the GP15 button stops the payload and releases all the keys.
+    # The garbage collector runs in the DELAYs, not in the middle of a STRING.
+    interpreter = Interpreter(
+        abort_sources=[AbortButton(board.GP15)],
+        collector=Collector(),
+    )
+    log = interpreter.enable_log() if os.getenv("RASPER_DUCKY_LOG") else None
+    # The payload was compiled while the host enumerated the keyboard, start it
+    # as soon as the host is listening
+    if not interpreter.wait_for_host(HOST_TIMEOUT_MS):
+        print("No LED report from the host, starting anyway")
+    if os.getenv("RASPER_DUCKY_STATS"):
+        # The board's clock starts at power on, so this is the time from boot
+        # to the first keystroke
+        print(
+            f"Payload {'loaded' if cached else 'compiled'} in {load_ms} ms, "
+            f"typing from {time.monotonic_ns() // 1_000_000} ms after boot"
+        )
+    try:
+        memory.measure("Interpreter", interpreter.interpret, ast)
+    except Exception:
+        print("Last strings typed:")
+        interpreter.history.dump(sys.stdout)
+        raise
+    finally:
+        if log is not None:
+            log.drain()
+    if os.getenv("RASPER_DUCKY_STATS"):
+        print("Payload stats:", interpreter.stats())
 
 
 with open("payload.dd", "r") as file:
     payload_code = file.read()
 
 
-execute(payload_code)
+# Free memory and allocations of each stage, to find the one running out of memory
+memory = MemoryReport(bool(os.getenv("RASPER_DUCKY_MEMORY")))
+try:
+    execute(payload_code, memory)
+finally:
+    if memory.enabled:
+        print("Memory per stage (bytes):")
+        memory.export_text(sys.stdout)
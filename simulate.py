@@ -0,0 +1,65 @@
+"""Run payloads on a simulated keyboard, without a Raspberry Pi Pico.
+
+Every payload is compiled and checked like on the device, then executed with a
+virtual clock: DELAYs return immediately and every HID report is recorded with
+the time it would have been sent at.
+
+With --profile, the time and keystrokes of each line and FUNCTION are printed,
+and the collapsed stacks are written next to the payload for flame graphs.
+With --stats, the counters of the run are printed.
+
+Usage: python simulate.py [--trace] [--profile] [--stats] PAYLOAD...
+"""
+
+import sys
+
+sys.path.insert(0, "stubs")
+
+from rasper_ducky.duckyscript.checker import LayoutChecker
+from rasper_ducky.duckyscript.lexer import Lexer
+from rasper_ducky.duckyscript.parser import Parser
+from rasper_ducky.duckyscript.preprocessor import Preprocessor
+from rasper_ducky.duckyscript.simulation import Simulation
+
+
+def simulate(path: str, trace: bool, profile: bool, stats: bool) -> bool:
+    with open(path, "r") as file:
+        code = Preprocessor().process(file.read())
+
+    simulation = Simulation()
+    profiler = simulation.interpreter.enable_profiler() if profile else None
+    try:
+        ast = Parser(list(Lexer(code).tokenize())).parse()
+        LayoutChecker().check(ast)
+        device = simulation.run(ast)
+    except (SyntaxError, ValueError, RuntimeError) as error:
+        print(f"{path}: {type(error).__name__}: {error}")
+        return False
+
+    print(
+        f"{path}: {simulation.elapsed_ms / 1000:.3f} s, "
+        f"{len(device.events)} reports, {len(device.keystrokes())} keystrokes"
+    )
+    if stats:
+        for name, value in simulation.interpreter.stats().items():
+            print(f"  {name}: {value}")
+    if trace:
+        device.export(sys.stdout)
+    if profiler:
+        profiler.export_text(sys.stdout)
+        with open(f"{path}.collapsed", "w") as file:
+            profiler.export_collapsed(file)
+    return True
+
+
+args = sys.argv[1:]
+trace = "--trace" in args
+profile = "--profile" in args
+stats = "--stats" in args
+payloads = [arg for arg in args if arg not in ("--trace", "--profile", "--stats")]
+if not payloads:
+    print(__doc__)
+    sys.exit(1)
+
+results = [simulate(payload, trace, profile, stats) for payload in payloads]
+sys.exit(0 if all(results) else 1)
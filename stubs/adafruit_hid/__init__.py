@@ -0,0 +1,10 @@
+from usb_hid import Device
+
+
+def find_device(
+    devices: list[Device], *, usage_page: int, usage: int, timeout: int | None = None
+) -> Device:
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage:
+            return device
+    raise ValueError("Could not find matching HID device.")
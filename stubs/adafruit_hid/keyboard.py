@@ -1,16 +1,14 @@
 from unittest.mock import MagicMock
 
-from adafruit_hid.keycode import Keycode
-
 
 class Keyboard(MagicMock):
     def __init__(self, args):
         pass
 
-    def press(self, key: Keycode):
+    def press(self, *keycodes: int):
         pass
 
-    def release(self, key: Keycode):
+    def release(self, *keycodes: int):
         pass
 
     def release_all(self):
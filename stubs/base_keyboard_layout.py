@@ -1,7 +1,68 @@
+from typing import ClassVar
+
 from adafruit_hid.keyboard import Keyboard
 
+SHIFT = 0x80
+
+# US layout keycodes for the printable ASCII characters, SHIFT_FLAG set where
+# the character needs shift, like the real keyboard_layout_* modules
+_ASCII_KEYCODES = {
+    "\b": 0x2A,
+    "\t": 0x2B,
+    "\n": 0x28,
+    "\x1b": 0x29,
+    " ": 0x2C,
+    "!": 0x1E | SHIFT,
+    '"': 0x34 | SHIFT,
+    "#": 0x20 | SHIFT,
+    "$": 0x21 | SHIFT,
+    "%": 0x22 | SHIFT,
+    "&": 0x24 | SHIFT,
+    "'": 0x34,
+    "(": 0x26 | SHIFT,
+    ")": 0x27 | SHIFT,
+    "*": 0x25 | SHIFT,
+    "+": 0x2E | SHIFT,
+    ",": 0x36,
+    "-": 0x2D,
+    ".": 0x37,
+    "/": 0x38,
+    "0": 0x27,
+    ":": 0x33 | SHIFT,
+    ";": 0x33,
+    "<": 0x36 | SHIFT,
+    "=": 0x2E,
+    ">": 0x37 | SHIFT,
+    "?": 0x38 | SHIFT,
+    "@": 0x1F | SHIFT,
+    "[": 0x2F,
+    "\\": 0x31,
+    "]": 0x30,
+    "^": 0x23 | SHIFT,
+    "_": 0x2D | SHIFT,
+    "`": 0x35,
+    "{": 0x2F | SHIFT,
+    "|": 0x31 | SHIFT,
+    "}": 0x30 | SHIFT,
+    "~": 0x35 | SHIFT,
+    "\x7f": 0x4C,
+}
+_ASCII_KEYCODES.update({str(digit): 0x1E + digit - 1 for digit in range(1, 10)})
+_ASCII_KEYCODES.update({chr(ord("a") + i): 0x04 + i for i in range(26)})
+_ASCII_KEYCODES.update({chr(ord("A") + i): (0x04 + i) | SHIFT for i in range(26)})
+
 
 class BaseKeyboardLayout:
+    SHIFT_FLAG = SHIFT
+    ALTGR_FLAG = 0x80
+    SHIFT_CODE = 0xE1
+    RIGHT_ALT_CODE = 0xE6
+    ASCII_TO_KEYCODE = bytes(_ASCII_KEYCODES.get(chr(i), 0) for i in range(128))
+    NEED_ALTGR = "€"
+    HIGHER_ASCII: ClassVar[dict[int, int]] = {0x20AC: 0x08}  # € is AltGr + E
+    # ê is the dead key ^ followed by e
+    COMBINED_KEYS: ClassVar[dict[str, int]] = {"ê": 0x2F65}
+
     def __init__(self, keyboard: Keyboard):
         self.keyboard = keyboard
 
@@ -11,3 +72,21 @@ class BaseKeyboardLayout:
             # In a real implementation, this would map characters to correct keycodes
             # For stub purposes, we just pass
             pass
+
+    def keycodes(self, char: str) -> tuple[int, ...]:
+        """Return the keycodes needed to type the character, like adafruit_hid does"""
+        if ord(char) < len(self.ASCII_TO_KEYCODE):
+            keycode = self.ASCII_TO_KEYCODE[ord(char)]
+        else:
+            keycode = self.HIGHER_ASCII.get(ord(char), 0)
+        if keycode == 0:
+            raise ValueError(f"No keycode available for character {char}")
+
+        codes: list[int] = []
+        if char in self.NEED_ALTGR:
+            codes.append(self.RIGHT_ALT_CODE)
+        if keycode & self.SHIFT_FLAG:
+            codes.extend((self.SHIFT_CODE, keycode & ~self.SHIFT_FLAG))
+        else:
+            codes.append(keycode)
+        return tuple(codes)
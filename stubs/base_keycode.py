@@ -1,67 +1,67 @@
 class BaseKeycode:
-    WINDOWS = 1
+    WINDOWS = 0xE3
     GUI = WINDOWS
-    APP = APPLICATION = 1
-    SHIFT = 1
-    ALT = 1
-    CONTROL = CTRL = 1
-    DOWNARROW = DOWN_ARROW = DOWN = 1
-    LEFTARROW = LEFT_ARROW = LEFT = 1
-    RIGHTARROW = RIGHT_ARROW = RIGHT = 1
-    UPARROW = UP_ARROW = UP = 1
-    BREAK = PAUSE = 1
-    CAPSLOCK = CAPS_LOCK = 1
-    DELETE = 1
-    END = 1
-    ESC = ESCAPE = 1
-    HOME = 1
-    INSERT = 1
-    NUMLOCK = KEYPAD_NUMLOCK = 1
-    PAGEUP = PAGE_UP = 1
-    PAGEDOWN = PAGE_DOWN = 1
-    PRINTSCREEN = PRINT_SCREEN = 1
-    ENTER = 1
-    SCROLLLOCK = SCROLL_LOCK = 1
-    SPACE = 1
-    TAB = 1
-    BACKSPACE = 1
+    APP = APPLICATION = 0x65
+    SHIFT = 0xE1
+    ALT = 0xE2
+    CONTROL = CTRL = 0xE0
+    DOWNARROW = DOWN_ARROW = DOWN = 0x51
+    LEFTARROW = LEFT_ARROW = LEFT = 0x50
+    RIGHTARROW = RIGHT_ARROW = RIGHT = 0x4F
+    UPARROW = UP_ARROW = UP = 0x52
+    BREAK = PAUSE = 0x48
+    CAPSLOCK = CAPS_LOCK = 0x39
+    DELETE = 0x4C
+    END = 0x4D
+    ESC = ESCAPE = 0x29
+    HOME = 0x4A
+    INSERT = 0x49
+    NUMLOCK = KEYPAD_NUMLOCK = 0x53
+    PAGEUP = PAGE_UP = 0x4B
+    PAGEDOWN = PAGE_DOWN = 0x4E
+    PRINTSCREEN = PRINT_SCREEN = 0x46
+    ENTER = 0x28
+    SCROLLLOCK = SCROLL_LOCK = 0x47
+    SPACE = 0x2C
+    TAB = 0x2B
+    BACKSPACE = 0x2A
 
-    A = 1
-    B = 1
-    C = 1
-    D = 1
-    E = 1
-    F = 1
-    G = 1
-    H = 1
-    I = 1
-    J = 1
-    K = 1
-    L = 1
-    M = 1
-    N = 1
-    O = 1
-    P = 1
-    Q = 1
-    R = 1
-    S = 1
-    T = 1
-    U = 1
-    V = 1
-    W = 1
-    X = 1
-    Y = 1
-    Z = 1
+    A = 0x04
+    B = 0x05
+    C = 0x06
+    D = 0x07
+    E = 0x08
+    F = 0x09
+    G = 0x0A
+    H = 0x0B
+    I = 0x0C
+    J = 0x0D
+    K = 0x0E
+    L = 0x0F
+    M = 0x10
+    N = 0x11
+    O = 0x12
+    P = 0x13
+    Q = 0x14
+    R = 0x15
+    S = 0x16
+    T = 0x17
+    U = 0x18
+    V = 0x19
+    W = 0x1A
+    X = 0x1B
+    Y = 0x1C
+    Z = 0x1D
 
-    F1 = 1
-    F2 = 1
-    F3 = 1
-    F4 = 1
-    F5 = 1
-    F6 = 1
-    F7 = 1
-    F8 = 1
-    F9 = 1
-    F10 = 1
-    F11 = 1
-    F12 = 1
+    F1 = 0x3A
+    F2 = 0x3B
+    F3 = 0x3C
+    F4 = 0x3D
+    F5 = 0x3E
+    F6 = 0x3F
+    F7 = 0x40
+    F8 = 0x41
+    F9 = 0x42
+    F10 = 0x43
+    F11 = 0x44
+    F12 = 0x45
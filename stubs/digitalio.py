@@ -7,11 +7,15 @@ class Pull(Enum):
 
 class DigitalInOut:
     def __init__(self, pin):
-        pass
+        self._value = True
 
     def switch_to_input(self, pull: Pull):
         pass
 
     @property
     def value(self):
-        return True
+        return self._value
+
+    def set_level(self, value: bool):
+        """Simulate the level of the pin, low when a button pulls it to the ground"""
+        self._value = value
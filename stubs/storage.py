@@ -1,2 +1,10 @@
 def disable_usb_drive():
     pass
+
+
+def remount(
+    mount_path: str,
+    readonly: bool = False,
+    disable_concurrent_write_protection: bool = False,
+):
+    pass
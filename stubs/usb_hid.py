@@ -1 +1,42 @@
-devices: list[None] = []
+class Device:
+    def __init__(self, usage_page: int, usage: int):
+        self.usage_page = usage_page
+        self.usage = usage
+        self.last_received_report: bytes | None = None
+        # Enumeration simulated by `plug`
+        self.clock = None
+        self.enumerated_ns = 0
+        self.led_report: bytes | None = None
+
+    def plug(self, clock, enumeration_ms: int, led_report: bytes | None = b"\x00"):
+        """Simulate a host enumerating the device `enumeration_ms` from now.
+
+        The host then sends `led_report`, or no LED report at all if None.
+        """
+        self.clock = clock
+        self.enumerated_ns = clock.monotonic_ns() + enumeration_ms * 1_000_000
+        self.led_report = led_report
+
+    def send_report(self, report: bytearray, report_id: int | None = None):
+        if not self._enumerated():
+            raise OSError("USB busy")
+
+    def get_last_received_report(self, report_id: int | None = None) -> bytes | None:
+        if self.led_report is not None and self._enumerated():
+            self.last_received_report, self.led_report = self.led_report, None
+        # Like CircuitPython, a received report is only returned once
+        report, self.last_received_report = self.last_received_report, None
+        return report
+
+    def _enumerated(self) -> bool:
+        # Devices never plugged are always enumerated
+        return self.clock is None or self.clock.monotonic_ns() >= self.enumerated_ns
+
+    def receive_report(self, report: bytes):
+        """Simulate an output report from the host, like the keyboard LEDs"""
+        self.last_received_report = bytes(report)
+
+
+KEYBOARD = Device(usage_page=0x01, usage=0x06)
+
+devices: list[Device] = [KEYBOARD]
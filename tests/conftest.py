@@ -0,0 +1,33 @@
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.lexer import Lexer
+from rasper_ducky.duckyscript.parser import Parser, Stmt
+from rasper_ducky.duckyscript.preprocessor import Preprocessor
+from rasper_ducky.duckyscript.simulation import SimulatedDevice, Simulation
+
+# Helpers shared by the tests, imported with `from conftest import ...`
+
+
+def parse(code: str) -> list[Stmt]:
+    """Return the program of `code`, preprocessed, tokenized and parsed."""
+    code = Preprocessor().process(code)
+    return Parser(list(Lexer(code).tokenize())).parse()
+
+
+def simulate(code: str, host_latency_ms: int = 10) -> Simulation:
+    """Run `code` against a simulated keyboard, returning the simulation."""
+    simulation = Simulation(host_latency_ms)
+    simulation.run(parse(code))
+    return simulation
+
+
+def simulated_interpreter(
+    interpreter_class=Interpreter, host_latency_ms: int = 10, **kwargs
+):
+    """Return an interpreter typing on a simulated keyboard with a virtual clock.
+
+    The keyboard and the clock are its `device` and `clock`.
+    """
+    clock = VirtualClock()
+    device = SimulatedDevice(clock, host_latency_ms)
+    return interpreter_class(device, clock, **kwargs)
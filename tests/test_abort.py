@@ -0,0 +1,159 @@
+import asyncio
+
+import board
+import pytest
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.abort import AbortButton, AbortFlag, PayloadAborted
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.clock import Clock, VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.scheduler import ABORT_POLL_NS
+from rasper_ducky.duckyscript.simulation import SimulatedDevice
+
+RELEASED = bytes(8)
+
+
+class TimedSource:
+    """Abort source triggered once the clock reaches `at_ns`"""
+
+    def __init__(self, clock, at_ns: int):
+        self.clock = clock
+        self.at_ns = at_ns
+
+    def triggered(self) -> bool:
+        return self.clock.monotonic_ns() >= self.at_ns
+
+
+def run_until_aborted(code: str, at_ms: int) -> SimulatedDevice:
+    clock = VirtualClock()
+    device = SimulatedDevice(clock)
+    interpreter = Interpreter(device, clock, [TimedSource(clock, at_ms * 1_000_000)])
+    with pytest.raises(PayloadAborted):
+        interpreter.interpret(parse(code))
+    return device
+
+
+def test_button_triggers_on_press():
+    button = AbortButton(board.GP15)
+    assert not button.triggered()
+    button.pin.set_level(False)
+    assert button.triggered()
+    assert not button.triggered()
+    button.pin.set_level(True)
+    assert not button.triggered()
+
+
+def test_button_held_at_start_does_not_trigger():
+    button = AbortButton(board.GP15)
+    button.pin.set_level(False)
+    button.released = False
+    assert not button.triggered()
+
+
+def test_abort_flag():
+    flag = AbortFlag()
+    flag.check()
+    flag.request()
+    with pytest.raises(PayloadAborted):
+        flag.check()
+
+
+def test_abort_request_stops_before_the_next_statement():
+    interpreter = Interpreter()
+    interpreter.abort()
+    with pytest.raises(PayloadAborted):
+        interpreter.interpret(parse("STRING a"))
+    assert interpreter.execution_stack == []
+
+
+def test_abort_empty_infinite_loop():
+    device = run_until_aborted(
+        """
+        WHILE TRUE
+        END_WHILE
+        """,
+        at_ms=0,
+    )
+    assert device.events == [(0, RELEASED)]
+
+
+def test_abort_releases_held_keys():
+    device = run_until_aborted(
+        """
+        HOLD SHIFT
+        STRING_DELAY 10
+        STRING abababababababababab
+        """,
+        at_ms=50,
+    )
+    timestamp, report = device.events[-1]
+    assert report == RELEASED
+    # Stopped within one report interval of 5ms
+    assert 50_000_000 <= timestamp <= 55_000_000
+    assert 0 < len(device.typed()) < 20
+
+
+def test_abort_during_delay():
+    device = run_until_aborted(
+        """
+        HOLD GUI
+        DELAY 30000
+        """,
+        at_ms=1000,
+    )
+    timestamp, report = device.events[-1]
+    assert report == RELEASED
+    assert 1_000_000_000 <= timestamp <= 1_000_000_000 + ABORT_POLL_NS
+
+
+def test_error_releases_held_keys():
+    interpreter = simulated_interpreter()
+    with pytest.raises(RuntimeError, match="Undefined variable"):
+        interpreter.interpret(
+            parse(
+                """
+                HOLD CTRL
+                $y = $x
+                """
+            )
+        )
+    assert interpreter.device.events[-1][1] == RELEASED
+
+
+def test_async_abort_cancels_a_delay():
+    clock = Clock()
+    device = SimulatedDevice(clock)
+    interpreter = AsyncInterpreter(device, clock)
+
+    async def abort_later():
+        await asyncio.sleep(0.02)
+        interpreter.abort()
+
+    async def main():
+        asyncio.create_task(abort_later())
+        await interpreter.run(
+            parse(
+                """
+                HOLD ALT
+                DELAY 10000
+                """
+            )
+        )
+
+    start = clock.monotonic_ns()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main())
+    assert clock.monotonic_ns() - start < 1_000_000_000
+    assert device.events[-1][1] == RELEASED
+
+
+def test_async_abort_during_delay():
+    clock = VirtualClock()
+    device = SimulatedDevice(clock)
+    interpreter = AsyncInterpreter(device, clock, [TimedSource(clock, 1_000_000_000)])
+    with pytest.raises(PayloadAborted):
+        asyncio.run(interpreter.run(parse("HOLD GUI\nDELAY 30000\n")))
+    timestamp, report = device.events[-1]
+    assert report == RELEASED
+    assert 1_000_000_000 <= timestamp <= 1_000_000_000 + ABORT_POLL_NS
@@ -0,0 +1,102 @@
+import gc
+import tracemalloc
+
+from conftest import parse
+
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+
+PAYLOAD = """
+$x = 0
+WHILE ($x < $n)
+    $x = $x + 1
+    IF (($x > 5) && !($x == 7)) THEN
+        $y = ($x * 2) - 1
+    END_IF
+    STRING ab
+    STRINGLN c
+    CTRL C
+    HOLD SHIFT
+    RELEASE SHIFT
+    DELAY 1
+    DELAY 2.5
+END_WHILE
+"""
+
+
+class NullDevice:
+    """HID device dropping the reports, a recording one would allocate."""
+
+    def send_report(self, report, report_id=None):
+        pass
+
+    def get_last_received_report(self, report_id=None):
+        return None
+
+
+def test_steady_state_loop_does_not_allocate():
+    ast = parse(PAYLOAD)
+    interpreter = Interpreter(NullDevice(), VirtualClock())
+    interpreter.variables["$n"] = 10_000
+    package = [tracemalloc.Filter(True, "*rasper_ducky*")]
+
+    tracemalloc.start()
+    try:
+        # A first run resolves the operators and keycodes, compiles the strings
+        # and fills CPython's own caches. Checkpointing on every statement runs
+        # the slice path too. A second one leaves the start time of the last
+        # run in the interpreter, like the measured run does.
+        interpreter.interpret(ast, slice_steps=1)
+        interpreter.variables["$n"] = 1000
+        interpreter.interpret(ast, slice_steps=1)
+        gc.collect()
+        before = tracemalloc.take_snapshot().filter_traces(package)
+        interpreter.variables["$n"] = 10_000
+        interpreter.interpret(ast, slice_steps=1)
+        gc.collect()
+        after = tracemalloc.take_snapshot().filter_traces(package)
+    finally:
+        tracemalloc.stop()
+
+    allocated = [
+        str(stat) for stat in after.compare_to(before, "lineno") if stat.size_diff > 0
+    ]
+    assert interpreter.variables["$x"] == 10_000
+    assert allocated == []
+
+
+def test_numbers_are_converted_by_the_parser():
+    ast = parse("$x = 12\n$y = 2.5\n")
+    assert ast[0].expression.value.value == 12
+    # Not an integer, left for the interpreter to reject
+    assert ast[1].expression.value.value == "2.5"
+
+
+def test_strings_are_compiled_once_per_layout():
+    ast = parse("STRING @a\nSTRINGLN @a\n")
+    interpreter = Interpreter(NullDevice(), VirtualClock())
+    interpreter.interpret(ast)
+    strokes = [node.strokes for node in ast]
+    assert list(strokes[0]) == list(interpreter.keyboard.keystrokes("@a"))
+    interpreter.interpret(ast)
+    assert ast[0].strokes is strokes[0]
+    assert ast[1].strokes is strokes[1]
+
+    interpreter.interpret(parse("RD_KBD WIN FR\n"))
+    interpreter.interpret(ast)
+    assert ast[0].layout_table is interpreter.keyboard.table
+    assert ast[0].strokes is not strokes[0]
+    assert list(ast[0].strokes) == list(interpreter.keyboard.keystrokes("@a"))
+
+
+def test_keycodes_are_resolved_once_per_layout():
+    ast = parse("CTRL C\n")
+    interpreter = Interpreter(NullDevice(), VirtualClock())
+    interpreter.interpret(ast)
+    keycodes = ast[0].keycodes
+    interpreter.interpret(ast)
+    assert ast[0].keycodes is keycodes
+
+    interpreter.interpret(parse("RD_KBD WIN FR\n"))
+    interpreter.interpret(ast)
+    assert ast[0].keycode_table is interpreter.keyboard.KEYCODES
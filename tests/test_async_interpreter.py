@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import pytest
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.clock import Clock
+from rasper_ducky.duckyscript.simulation import SimulatedDevice
+
+
+def test_same_reports_as_the_blocking_interpreter():
+    ast = parse(
+        """
+        FUNCTION hello()
+            STRINGLN Hello, World!
+        END_FUNCTION
+
+        $x = 0
+        WHILE ($x < 2)
+            IF ($x == 0) THEN
+                hello()
+            ELSE
+                CTRL ALT DELETE
+                STRING ê
+            END_IF
+            $x = $x + 1
+        END_WHILE
+        """
+    )
+    interpreter = simulated_interpreter()
+    interpreter.interpret(ast)
+
+    async_interpreter = simulated_interpreter(AsyncInterpreter)
+    asyncio.run(async_interpreter.run(ast))
+
+    assert async_interpreter.device.events == interpreter.device.events
+
+
+def test_other_tasks_run_during_the_payload():
+    clock = Clock()
+    device = SimulatedDevice(clock)
+    interpreter = AsyncInterpreter(device, clock)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(clock.monotonic_ns())
+            await asyncio.sleep(0.005)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await interpreter.run(
+            parse(
+                """
+                STRING_DELAY 10
+                STRING abcabc
+                DELAY 60
+                """
+            )
+        )
+        task.cancel()
+
+    asyncio.run(main())
+
+    assert device.typed() == "abcabc"
+    # 8 reports 5ms apart, then the delay
+    assert len(ticks) >= 10
+    assert ticks[-1] - ticks[0] >= 60_000_000
+
+
+def test_default_delay_is_awaited():
+    clock = Clock()
+    device = SimulatedDevice(clock)
+    interpreter = AsyncInterpreter(device, clock)
+    start = clock.monotonic_ns()
+
+    asyncio.run(
+        interpreter.run(
+            parse(
+                """
+                DEFAULT_DELAY 20
+                ENTER
+                ENTER
+                """
+            )
+        )
+    )
+
+    assert clock.monotonic_ns() - start >= 40_000_000
+    assert interpreter.scheduler.count == 2
+
+
+def test_lock_key_answered_before_the_change_wait():
+    interpreter = simulated_interpreter(AsyncInterpreter, host_latency_ms=5)
+    ast = parse("DEFAULT_DELAY 50\nCAPSLOCK\nWAIT_FOR_CAPS_CHANGE\nSTRING a\n")
+    asyncio.run(interpreter.run(ast))
+    assert interpreter.device.typed() == "a"
+
+
+def test_calls_in_expressions_and_random_strings_send_the_same_reports():
+    ast = parse(
+        """
+        $_RANDOM_SEED = 3
+        FUNCTION hello()
+            STRING hi
+        END_FUNCTION
+        VAR $r = hello()
+        RANDOM_LETTER 5
+        RANDOM_CHAR_FROM xyz
+        """
+    )
+    interpreter = simulated_interpreter()
+    interpreter.interpret(ast)
+
+    async_interpreter = simulated_interpreter(AsyncInterpreter)
+    asyncio.run(async_interpreter.run(ast))
+
+    assert async_interpreter.device.events == interpreter.device.events
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "FUNCTION pause()\nDELAY 60\nEND_FUNCTION\nVAR $r = pause()\n",
+        "STRING_DELAY 10\nRANDOM_LETTER 8\n",
+    ],
+)
+def test_other_tasks_run_during_calls_in_expressions_and_random_strings(code):
+    clock = Clock()
+    interpreter = AsyncInterpreter(SimulatedDevice(clock), clock)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(clock.monotonic_ns())
+            await asyncio.sleep(0.005)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await interpreter.run(parse(code))
+        task.cancel()
+
+    asyncio.run(main())
+
+    assert len(ticks) >= 8
+
+
+def test_waits_are_simulated_on_the_virtual_clock():
+    interpreter = simulated_interpreter(AsyncInterpreter)
+    start = time.monotonic()
+    asyncio.run(interpreter.run(parse("DELAY 3000\nSTRING_DELAY 500\nSTRING abcd\n")))
+    assert time.monotonic() - start < 0.5
+    timestamps = [timestamp for timestamp, _, _ in interpreter.device.keystrokes()]
+    assert timestamps == [3_000_000_000 + i * 500_000_000 for i in range(4)]
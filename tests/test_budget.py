@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.budget import Budget, BudgetExceeded
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+
+INFINITE_LOOP = """
+$x = 0
+WHILE TRUE
+    $x = $x + 1
+END_WHILE
+"""
+
+
+def test_statement_budget():
+    interpreter = Interpreter(budget=Budget(max_statements=50))
+    with pytest.raises(
+        BudgetExceeded, match="Statement budget of 50 exceeded at line 4"
+    ) as error:
+        interpreter.interpret(parse(INFINITE_LOOP))
+
+    assert error.value.budget == "Statement"
+    assert error.value.limit == 50
+    assert error.value.line == 4
+    assert interpreter.steps == 51
+
+
+def test_statement_budget_not_exceeded():
+    interpreter = Interpreter(budget=Budget(max_statements=3))
+    interpreter.interpret(parse("$x = 1\n$y = 2\n$z = 3\n"))
+    assert interpreter.variables == {"$x": 1, "$y": 2, "$z": 3}
+
+
+def test_time_budget_of_an_empty_loop():
+    interpreter = Interpreter(budget=Budget(max_time_ms=20))
+    with pytest.raises(BudgetExceeded, match="Time budget of 20 exceeded at line 2"):
+        interpreter.interpret(parse("\nWHILE TRUE\nEND_WHILE\n"))
+
+
+def test_time_budget_stops_a_delay():
+    clock = VirtualClock()
+    interpreter = Interpreter(clock=clock, budget=Budget(max_time_ms=1000))
+    with pytest.raises(BudgetExceeded, match="at line 1"):
+        interpreter.interpret(parse("DELAY 60000"))
+    assert clock.now_ns < 1_100_000_000
+
+
+def test_async_time_budget_stops_a_delay():
+    interpreter = simulated_interpreter(
+        AsyncInterpreter, budget=Budget(max_time_ms=1000)
+    )
+    with pytest.raises(BudgetExceeded, match="at line 1"):
+        asyncio.run(interpreter.run(parse("DELAY 60000")))
+    assert interpreter.clock.now_ns < 1_100_000_000
+
+
+def test_keystroke_budget_stops_typing():
+    interpreter = simulated_interpreter(budget=Budget(max_keystrokes=10))
+    with pytest.raises(
+        BudgetExceeded, match="Keystroke budget of 10 exceeded at line 2"
+    ):
+        interpreter.interpret(parse("ENTER\nSTRING " + "ab" * 50))
+
+    assert interpreter.device.events[-1][1] == bytes(8)
+    assert len(interpreter.device.keystrokes()) == 11
+
+
+def test_on_slice_is_called_every_slice():
+    slices = []
+    interpreter = Interpreter()
+    interpreter.interpret(
+        parse(
+            """
+            $x = 0
+            WHILE ($x < 100)
+                $x = $x + 1
+            END_WHILE
+            """
+        ),
+        on_slice=lambda: slices.append(interpreter.steps),
+        slice_steps=25,
+    )
+    assert interpreter.steps == 102
+    assert slices == [25, 50, 75, 100]
+
+
+def test_async_time_slices_let_other_tasks_run():
+    interpreter = AsyncInterpreter()
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(interpreter.steps)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await interpreter.run(
+            parse(
+                """
+                $x = 0
+                WHILE ($x < 100)
+                    $x = $x + 1
+                END_WHILE
+                """
+            ),
+            slice_steps=10,
+        )
+        task.cancel()
+
+    asyncio.run(main())
+    assert ticks[:4] == [10, 20, 30, 40]
@@ -0,0 +1,58 @@
+import pytest
+from conftest import parse
+
+from rasper_ducky.duckyscript.checker import LayoutChecker
+
+
+def check(code: str):
+    LayoutChecker().check(parse(code))
+
+
+def test_typeable_literals():
+    check(
+        """STRING Hello, World!
+STRINGLN ê€
+RANDOM_CHAR_FROM aAzZ!#1,;:!()
+"""
+    )
+
+
+def test_untypeable_characters_are_all_reported():
+    with pytest.raises(SyntaxError) as error:
+        check(
+            """STRING Hello
+IF TRUE THEN
+    STRINGLN aжb
+END_IF
+FUNCTION f()
+    RANDOM_CHAR_FROM ab✓
+END_FUNCTION
+"""
+        )
+    assert str(error.value).split("\n") == [
+        "Character 'ж' can't be typed with layout WIN UK at line 3, column 15",
+        "Character '✓' can't be typed with layout WIN UK at line 6, column 24",
+    ]
+
+
+def test_unknown_layout_is_reported():
+    with pytest.raises(SyntaxError, match="Language xx not supported for platform win at line 1"):
+        check(
+            """RD_KBD WIN XX
+STRING ж
+"""
+        )
+
+
+def test_literals_are_checked_against_the_active_layout(mocker):
+    mock_layout_table = mocker.patch("rasper_ducky.duckyscript.checker.layout_table")
+    check(
+        """STRING a
+RD_KBD WIN FR
+STRING b
+"""
+    )
+    assert mock_layout_table.call_args_list == [
+        mocker.call("win", "uk"),
+        mocker.call("win", "fr"),
+    ]
@@ -0,0 +1,176 @@
+import itertools
+
+import pytest
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript import memory
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.memory import Collector
+from rasper_ducky.duckyscript.simulation import SimulatedDevice
+
+PAYLOAD = """
+$x = 0
+WHILE ($x < 10)
+    STRING Get-ChildItem -Path C:\\ -Recurse
+    DELAY 100
+    $x = $x + 1
+END_WHILE
+"""
+
+
+class SimulatedHeap:
+    """CircuitPython heap of `size` bytes, each report allocating 256 of them.
+
+    A collection takes 30 ms and frees everything. The automatic one happens
+    when the heap is full, a full heap with the automatic collection disabled
+    raises MemoryError.
+    """
+
+    def __init__(self, clock, size=65_536):
+        self.clock = clock
+        self.size = size
+        self.free = size
+        self.enabled = True
+        self.collections = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def collect(self):
+        self.clock.sleep(0.030)
+        self.free = self.size
+        self.collections += 1
+
+    def mem_free(self):
+        return self.free
+
+    def allocate(self, size=256):
+        if self.free < size:
+            if not self.enabled:
+                raise MemoryError("memory allocation failed")
+            self.collect()
+        self.free -= size
+
+
+class AllocatingDevice(SimulatedDevice):
+    def __init__(self, clock, heap):
+        super().__init__(clock)
+        self.heap = heap
+
+    def send_report(self, report, report_id=None):
+        self.heap.allocate()
+        super().send_report(report, report_id)
+
+
+def run(monkeypatch, collector: bool):
+    clock = VirtualClock()
+    heap = SimulatedHeap(clock)
+    monkeypatch.setattr(memory, "gc", heap)
+    ast = parse(PAYLOAD)
+    device = AllocatingDevice(clock, heap)
+    interpreter = Interpreter(
+        device, clock, collector=Collector() if collector else None
+    )
+    interpreter.keyboard.set_rate(500)
+    interpreter.interpret(ast)
+    return interpreter, device, heap
+
+
+def max_gap_ms(device) -> float:
+    # Longest time between two reports of the same STRING
+    times = [time for time, _ in device.events]
+    gaps = [b - a for a, b in itertools.pairwise(times)]
+    return max(gap for gap in gaps if gap < 50_000_000) / 1e6
+
+
+def test_collections_happen_in_delays(monkeypatch):
+    _, device, heap = run(monkeypatch, collector=False)
+    assert heap.collections > 0
+    assert max_gap_ms(device) >= 30
+
+    interpreter, device, heap = run(monkeypatch, collector=True)
+    assert interpreter.collector.collections == 10
+    assert max_gap_ms(device) == 2
+    # The collections are absorbed by the DELAYs, nothing is late
+    assert interpreter.scheduler.late_count == 0
+    assert heap.enabled
+
+
+def test_short_delays_are_not_used(monkeypatch):
+    heap = SimulatedHeap(VirtualClock())
+    monkeypatch.setattr(memory, "gc", heap)
+    clock = VirtualClock()
+    collector = Collector(clock=clock)
+
+    collector.collect_in_delay(25_000_000)
+    assert collector.collections == 0
+    collector.collect_in_delay(31_000_000)
+    assert collector.collections == 1
+
+
+def test_collection_time_is_measured(monkeypatch):
+    clock = VirtualClock()
+    heap = SimulatedHeap(clock)
+    monkeypatch.setattr(memory, "gc", heap)
+    collector = Collector(clock=clock)
+    collector.collect()
+    assert collector.collect_ns == 30_000_000
+
+    collector.collect_in_delay(clock.monotonic_ns() + 35_000_000)
+    assert collector.collections == 1
+
+
+def test_low_memory_forces_a_collection(monkeypatch):
+    heap = SimulatedHeap(VirtualClock(), size=1000)
+    monkeypatch.setattr(memory, "gc", heap)
+    collector = Collector(4096, VirtualClock())
+    for _ in range(Collector.CHECK_EVERY):
+        assert not collector.triggered()
+    assert collector.forced_collections == 1
+    assert heap.collections == 1
+
+
+def test_gc_is_enabled_again_after_a_failure(monkeypatch):
+    heap = SimulatedHeap(VirtualClock())
+    monkeypatch.setattr(memory, "gc", heap)
+    interpreter = Interpreter(collector=Collector(clock=VirtualClock()))
+    ast = parse("STRING a\n$x = 1 / 0\n")
+    with pytest.raises(ZeroDivisionError):
+        interpreter.interpret(ast)
+    assert heap.enabled
+
+
+def test_collections_happen_between_strings_without_delays(monkeypatch):
+    clock = VirtualClock()
+    heap = SimulatedHeap(clock)
+    monkeypatch.setattr(memory, "gc", heap)
+    code = "STRING Get-ChildItem -Path C:\\ -Recurse\n" * 10
+    device = AllocatingDevice(clock, heap)
+    typed_at_collections = []
+    collect = heap.collect
+
+    def collect_and_record():
+        typed_at_collections.append(len(device.typed()))
+        collect()
+
+    heap.collect = collect_and_record
+    interpreter = Interpreter(device, clock, collector=Collector())
+    interpreter.interpret(parse(code))
+    # Collected before the strings that wouldn't fit, never during one
+    assert typed_at_collections
+    assert all(
+        typed % len("Get-ChildItem -Path C:\\ -Recurse") == 0
+        for typed in typed_at_collections
+    )
+    assert heap.enabled
+    assert device.typed().count("Get-ChildItem") == 10
+
+
+def test_collector_uses_the_interpreter_clock():
+    collector = Collector()
+    interpreter = simulated_interpreter(collector=collector)
+    assert collector.clock is interpreter.clock
@@ -0,0 +1,85 @@
+import io
+
+from conftest import parse
+
+from rasper_ducky.duckyscript import compiled
+from rasper_ducky.duckyscript.simulation import Simulation
+
+SOURCE = """
+DEFINE #COUNT 3
+FUNCTION shortcut()
+    CTRL ALT DELETE
+    HOLD SHIFT
+    RELEASE SHIFT
+END_FUNCTION
+$x = -(1 + 2) * 3
+IF ($x < #COUNT) THEN
+    STRING small
+ELSE IF ($x == 2) THEN
+    STRINGLN two
+ELSE
+    DELAY 2.5
+END_IF
+WHILE ($x < 0 && TRUE)
+    $x = $x + 1
+    shortcut()
+END_WHILE
+$_RANDOM_SEED = 1
+RANDOM_LETTER 5
+RANDOM_CHAR_FROM abc
+WAIT_FOR_CAPS_OFF
+DEFAULT_DELAY 10
+RD_KBD WIN FR
+STRINGLN Bonjour
+"""
+
+
+def dumped(source: str = SOURCE) -> io.StringIO:
+    file = io.StringIO()
+    compiled.dump(parse(source), source, file)
+    file.seek(0)
+    return file
+
+
+def test_loaded_program_is_the_compiled_one():
+    ast = compiled.load(SOURCE, dumped())
+    assert ast == parse(SOURCE)
+    assert [node.line for node in ast] == [node.line for node in parse(SOURCE)]
+
+
+def test_literal_types_are_kept():
+    source = "DELAY 2.5\n$x = 3\n$y = TRUE\n"
+    parsed, loaded = (
+        [
+            ast[0].value.value,
+            ast[1].expression.value.value,
+            ast[2].expression.value.value,
+        ]
+        for ast in (parse(source), compiled.load(source, dumped(source)))
+    )
+    assert [type(value) for value in loaded] == [type(value) for value in parsed]
+    assert loaded == parsed
+
+
+def test_loaded_program_runs_like_the_compiled_one():
+    typed = []
+    for ast in (parse(SOURCE), compiled.load(SOURCE, dumped())):
+        simulation = Simulation()
+        simulation.run(ast)
+        typed.append((simulation.device.events, simulation.device.typed()))
+    assert typed[0] == typed[1]
+
+
+def test_other_source_is_not_loaded():
+    assert compiled.load(SOURCE + "STRING more\n", dumped()) is None
+
+
+def test_other_version_is_not_loaded(monkeypatch):
+    file = dumped()
+    monkeypatch.setattr(compiled, "COMPILED_VERSION", compiled.COMPILED_VERSION + 1)
+    assert compiled.load(SOURCE, file) is None
+
+
+def test_incomplete_file_is_not_loaded():
+    text = dumped().getvalue()
+    assert compiled.load(SOURCE, io.StringIO(text[: len(text) // 2])) is None
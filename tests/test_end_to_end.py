@@ -1,29 +1,29 @@
 import pytest
-from rasper_ducky.duckyscript.lexer import Lexer
-from rasper_ducky.duckyscript.parser import Literal, Parser, StringStmt
+from conftest import parse
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.parser import Literal, StringStmt
 from rasper_ducky.duckyscript.interpreter import Interpreter
-from rasper_ducky.duckyscript.preprocessor import Preprocessor
-from unittest.mock import call
+from unittest.mock import ANY, call
+
+import usb_hid
 
 
 @pytest.fixture
 def mock_keyboard(mocker):
     mock_type_string = mocker.patch("rasper_ducky.duckyscript.interpreter.RasperDuckyKeyboard.type_string")
-    mock_press = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.press_key")
-    mock_release = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_key")
+    mock_press = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.press_keycodes")
+    mock_release = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_keycodes")
     mock_release_all = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_all")
     return mock_type_string, mock_press, mock_release, mock_release_all
 
 
-def execute(code: str):
-    preprocessor = Preprocessor()
-    code = preprocessor.process(code)
-    lexer = Lexer(code)
-    tokens = list(lexer.tokenize())
-    parser = Parser(tokens)
-    ast = parser.parse()
-    interpreter = Interpreter()
-    interpreter.interpret(ast)
+def keycodes(*keys: str) -> bytes:
+    return Interpreter().keyboard.keycodes(keys)
+
+
+def execute(code: str, clock=None):
+    interpreter = Interpreter(clock=clock)
+    interpreter.interpret(parse(code))
 
     return interpreter
 
@@ -45,7 +45,7 @@ def test_if_statement(mock_keyboard):
     assert interpreter.variables["$x"] == 10
     assert interpreter.variables["$y"] == 20
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("x is less than y")
+    mock_type_string.assert_called_with("x is less than y", ANY)
 
 
 def test_while_statement(mock_keyboard):
@@ -62,7 +62,7 @@ def test_while_statement(mock_keyboard):
     )
 
     assert mock_type_string.call_count == 5
-    mock_type_string.assert_called_with("Hello, World!")
+    mock_type_string.assert_called_with("Hello, World!", ANY)
 
 
 def test_assignment():
@@ -92,15 +92,15 @@ def test_print_string(mock_keyboard):
 
     execute("STRING Hello, World!")
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("Hello, World!")
+    mock_type_string.assert_called_with("Hello, World!", ANY)
 
 
-def test_print_stringln(mock_keyboard):
-    mock_type_string, _, _, _ = mock_keyboard
+def test_print_stringln(mocker):
+    mock_type_line = mocker.patch("rasper_ducky.duckyscript.interpreter.RasperDuckyKeyboard.type_line")
 
     execute("STRINGLN Hello, World!")
-    assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("Hello, World!")
+    assert mock_type_line.call_count == 1
+    mock_type_line.assert_called_with("Hello, World!", ANY)
 
 
 def test_booleans(mock_keyboard):
@@ -119,7 +119,7 @@ def test_booleans(mock_keyboard):
     )
     assert interpreter.variables == {}
     assert mock_type_string.call_count == 2
-    mock_type_string.assert_has_calls([call("A"), call("B")])
+    mock_type_string.assert_has_calls([call("A", ANY), call("B", ANY)])
 
 
 def test_nested_if_statements(mock_keyboard):
@@ -141,13 +141,70 @@ def test_nested_if_statements(mock_keyboard):
         """
     )
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("B")
+    mock_type_string.assert_called_with("B", ANY)
+
+
+def test_delay_statement():
+    clock = VirtualClock()
+    execute("DELAY 10", clock)
+    assert clock.now_ns == 10_000_000
+
+
+def test_consecutive_delays_do_not_drift(mocker):
+    clock = VirtualClock()
+    # Every statement takes 1ms to interpret
+    original_execute = Interpreter._execute
+
+    def slow_execute(self, node):
+        clock.now_ns += 1_000_000
+        original_execute(self, node)
+
+    mocker.patch.object(Interpreter, "_execute", slow_execute)
 
+    interpreter = execute(
+        """
+        $x = 0
+        WHILE ($x < 10)
+            DELAY 100
+            $x = $x + 1
+        END_WHILE
+        """,
+        clock,
+    )
+    # Only the last increment of $x is after the last deadline
+    assert clock.now_ns == 1_001_000_000
+    assert interpreter.scheduler.stats()["late"] == 0
 
-def test_delay_statement(mocker):
-    mock_sleep = mocker.patch("time.sleep")
-    execute("DELAY 10")
-    mock_sleep.assert_called_once_with(0.01)
+
+def test_delay_counts_from_the_last_keystroke():
+    clock = VirtualClock()
+    interpreter = execute(
+        """
+        DELAY 100
+        STRING_DELAY 100
+        STRING ab
+        DELAY 100
+        """,
+        clock,
+    )
+    # STRING ab takes 3 reports 50ms apart, the last one sent at 200ms
+    assert interpreter.keyboard.last_report_ns == 200_000_000
+    assert clock.now_ns == 300_000_000
+
+
+def test_late_delay_is_reported():
+    clock = VirtualClock()
+    interpreter = Interpreter(clock=clock)
+    interpreter.scheduler.wait(100)
+    clock.now_ns += 250_000_000
+    interpreter.scheduler.wait(100)
+    assert clock.now_ns == 350_000_000
+    assert interpreter.scheduler.stats() == {
+        "delays": 2,
+        "late": 1,
+        "max_lateness_ms": 150,
+        "mean_lateness_ms": 75,
+    }
 
 
 def test_chained_assign_statement():
@@ -178,7 +235,7 @@ def test_function_declaration(mock_keyboard):
 
     assert interpreter.functions["add"] == [StringStmt(Literal("Hello, World!"))]
     assert mock_type_string.call_count == 4
-    mock_type_string.assert_has_calls([call("Hello, World!") for _ in range(4)])
+    mock_type_string.assert_has_calls([call("Hello, World!", ANY) for _ in range(4)])
 
 
 def test_global_variables():
@@ -201,7 +258,7 @@ def test_keypress_statement(mock_keyboard):
     _, mock_press, _, mock_release_all = mock_keyboard
 
     execute("CTRL")
-    mock_press.assert_has_calls([call("CTRL")])
+    mock_press.assert_called_once_with(keycodes("CTRL"))
     mock_release_all.assert_called_once()
 
 
@@ -209,7 +266,7 @@ def test_keypress_statement_with_multiple_keys(mock_keyboard):
     _, mock_press, _, mock_release_all = mock_keyboard
 
     execute("CTRL ALT B")
-    mock_press.assert_has_calls([call("CTRL"), call("ALT"), call("B")])
+    mock_press.assert_called_once_with(keycodes("CTRL", "ALT", "B"))
     mock_release_all.assert_called_once()
 
 
@@ -230,7 +287,7 @@ def test_logical_operator_and(mock_keyboard):
     """
     )
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("A")
+    mock_type_string.assert_called_with("A", ANY)
 
 
 def test_logical_operator_or(mock_keyboard):
@@ -250,7 +307,7 @@ def test_logical_operator_or(mock_keyboard):
     """
     )
     assert mock_type_string.call_count == 2
-    mock_type_string.assert_has_calls([call("A"), call("B")])
+    mock_type_string.assert_has_calls([call("A", ANY), call("B", ANY)])
 
 
 def test_unary_operator_not(mock_keyboard):
@@ -267,7 +324,7 @@ def test_unary_operator_not(mock_keyboard):
     """
     )
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("A")
+    mock_type_string.assert_called_with("A", ANY)
 
 
 def test_unary_operator_minus():
@@ -286,7 +343,7 @@ def test_multiple_conditions(mock_keyboard):
         """
     )
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("True")
+    mock_type_string.assert_called_with("True", ANY)
 
 
 def test_define_statement(mock_keyboard):
@@ -301,11 +358,13 @@ def test_define_statement(mock_keyboard):
     """
     )
     assert mock_type_string.call_count == 1
-    mock_type_string.assert_called_with("A")
+    mock_type_string.assert_called_with("A", ANY)
 
 
 def test_random_char_statement(mocker):
-    mock_choice = mocker.patch("random.choice")
+    mock_choice = mocker.patch(
+        "rasper_ducky.duckyscript.randomchars.RandomChars.string", return_value="a"
+    )
 
     execute(
         """
@@ -321,11 +380,13 @@ def test_random_char_statement(mocker):
     assert mock_choice.call_count == len(Interpreter.RANDOM_CHAR_SETS)
 
     for value in Interpreter.RANDOM_CHAR_SETS.values():
-        mock_choice.assert_any_call(value)
+        mock_choice.assert_any_call(value, 1)
 
 
 def test_random_char_from_statement(mocker):
-    mock_choice = mocker.patch("random.choice")
+    mock_choice = mocker.patch(
+        "rasper_ducky.duckyscript.randomchars.RandomChars.string", return_value="a"
+    )
 
     execute("RANDOM_CHAR_FROM aAzZ!#1,;:!()")
 
@@ -337,13 +398,73 @@ def test_release_statement(mock_keyboard):
     _, _, mock_release, _ = mock_keyboard
 
     execute("RELEASE CTRL")
-    mock_release.assert_called_once_with("CTRL")
+    mock_release.assert_called_once_with(keycodes("CTRL"))
 
 
 def test_hold_statement(mock_keyboard):
     _, mock_press, _, mock_release_all = mock_keyboard
 
     execute("HOLD CTRL")
-    mock_press.assert_called_once_with("CTRL")
+    mock_press.assert_called_once_with(keycodes("CTRL"))
     mock_release_all.assert_not_called()
 
+
+
+def test_default_delay_statement(mocker, mock_keyboard):
+    mock_wait = mocker.patch(
+        "rasper_ducky.duckyscript.scheduler.DelayScheduler.wait"
+    )
+
+    execute(
+        """
+        DEFAULT_DELAY 100
+        STRING A
+        ENTER
+        """,
+        VirtualClock(),
+    )
+    assert mock_wait.call_args_list == [call(100, 0), call(100, 0)]
+
+
+def test_string_delay_statement():
+    interpreter = execute(
+        """
+        STRING_DELAY 20
+        """
+    )
+    assert interpreter.variables["$_STRING_DELAY"] == 20
+    assert interpreter.keyboard.keystroke_interval_ns == 20_000_000
+
+
+def test_string_delay_is_kept_when_changing_layout():
+    interpreter = execute(
+        """
+        $_STRING_DELAY = 20
+        RD_KBD WIN FR
+        """
+    )
+    assert interpreter.keyboard.language == "fr"
+    assert interpreter.keyboard.keystroke_interval_ns == 20_000_000
+
+
+@pytest.mark.parametrize(
+    "command, leds",
+    [
+        ("WAIT_FOR_CAPS_ON", [0x00, 0x01, 0x02]),
+        ("WAIT_FOR_CAPS_OFF", [0x02, 0x03, 0x00]),
+        ("WAIT_FOR_CAPS_CHANGE", [0x00, 0x01, 0x02]),
+        ("WAIT_FOR_NUM_CHANGE", [0x01, 0x03, 0x00]),
+        ("WAIT_FOR_SCROLL_ON", [0x00, 0x03, 0x04]),
+    ],
+)
+def test_wait_for_led_statement(mocker, command, leds):
+    device = usb_hid.KEYBOARD
+    device.receive_report(bytes([leds[0]]))
+    host_reports = iter(leds[1:])
+    mock_sleep = mocker.patch(
+        "time.sleep",
+        side_effect=lambda _: device.receive_report(bytes([next(host_reports)])),
+    )
+
+    execute(command)
+    assert mock_sleep.call_count == 2
@@ -0,0 +1,89 @@
+import asyncio
+import io
+
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.eventlog import EventLog
+
+
+class RecordingFile:
+    """File remembering the time of each write."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append((self.clock.monotonic_ns(), text))
+
+
+def test_records_are_written_in_order():
+    clock = VirtualClock()
+    file = io.StringIO()
+    log = EventLog(clock, file, 4)
+    log.record(1, "StringStmt")
+    clock.sleep(0.0015)
+    log.record(2, "DelayStmt")
+    log.drain()
+    assert file.getvalue() == "0 1 StringStmt\n1500 2 DelayStmt\n"
+    assert log.count == 0
+
+
+def test_full_log_drops_new_records():
+    file = io.StringIO()
+    log = EventLog(VirtualClock(), file, 2)
+    for line in range(1, 6):
+        log.record(line, "VarStmt")
+    assert log.dropped == 3
+
+    log.drain()
+    assert file.getvalue() == "0 1 VarStmt\n0 2 VarStmt\n3 records dropped\n"
+    log.drain()
+    assert file.getvalue().count("dropped") == 1
+
+
+def test_drain_stops_at_the_given_time():
+    clock = VirtualClock()
+    file = io.StringIO()
+    log = EventLog(clock, file, 4)
+    log.record(1, "VarStmt")
+    log.drain(0)
+    assert file.getvalue() == ""
+    assert log.count == 1
+
+
+def test_records_are_written_during_delays_only():
+    interpreter = simulated_interpreter()
+    file = RecordingFile(interpreter.clock)
+    interpreter.enable_log(file)
+    interpreter.interpret(parse("$x = 1\nSTRING a\nDELAY 100\n$x = 2\n"))
+
+    assert [text for _, text in file.writes] == [
+        "0 1 ExpressionStmt\n",
+        "0 2 StringStmt\n",
+        "0 3 DelayStmt\n",
+    ]
+    # Written at the start of the DELAY, after the STRING was typed
+    assert all(time == 0 for time, _ in file.writes)
+    assert interpreter.keyboard.keystroke_count == 1
+
+
+def test_short_delays_are_not_used():
+    file = io.StringIO()
+    interpreter = simulated_interpreter()
+    log = interpreter.enable_log(file)
+    interpreter.interpret(parse("$x = 1\nDELAY 5\n"))
+    assert file.getvalue() == ""
+
+    log.drain()
+    assert file.getvalue() == "0 1 ExpressionStmt\n0 2 DelayStmt\n"
+
+
+def test_async_interpreter_logs_during_delays():
+    file = io.StringIO()
+    interpreter = simulated_interpreter(AsyncInterpreter)
+    interpreter.enable_log(file)
+    asyncio.run(interpreter.run(parse("$x = 1\nDELAY 100\n")))
+    assert file.getvalue() == "0 1 ExpressionStmt\n0 2 DelayStmt\n"
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from conftest import parse
+
+from rasper_ducky.duckyscript.history import ExecutionHistory
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.parser import Literal, StringStmt
+
+
+def test_history_keeps_the_last_statements():
+    history = ExecutionHistory(3)
+    nodes = [StringStmt(Literal(str(i))) for i in range(5)]
+    for node in nodes:
+        history.record(node)
+
+    assert history.recent() == nodes[2:]
+    assert history.recent()[0] is nodes[2]
+
+
+def test_history_before_wrapping():
+    history = ExecutionHistory(3)
+    history.record(StringStmt(Literal("a")))
+    assert history.recent() == [StringStmt(Literal("a"))]
+
+
+def test_disabled_history():
+    history = ExecutionHistory(0)
+    history.record(StringStmt(Literal("a")))
+    assert history.recent() == []
+
+
+def test_clear():
+    history = ExecutionHistory(2)
+    history.record(StringStmt(Literal("a")))
+    history.clear()
+    assert history.recent() == []
+    assert history.nodes == [None, None]
+
+
+def test_long_payload_keeps_a_bounded_history():
+    interpreter = Interpreter(history_size=4)
+    interpreter.interpret(
+        parse(
+            """
+            $x = 0
+            WHILE ($x < 100)
+                STRING a
+                STRINGLN b
+                $x = $x + 1
+            END_WHILE
+            """
+        )
+    )
+    assert interpreter.execution_stack == ["a", "b", "a", "b"]
+    assert len(interpreter.history.nodes) == 4
+
+
+def test_dump_history_after_an_error():
+    interpreter = Interpreter()
+    with pytest.raises(RuntimeError, match="Undefined variable"):
+        interpreter.interpret(parse("STRING a\nSTRINGLN b\n$y = $x\n"))
+
+    output = io.StringIO()
+    interpreter.history.dump(output)
+    assert output.getvalue() == (
+        "line 1: PRINT_STR(LITERAL(a))\nline 2: PRINT_STRLN(LITERAL(b))\n"
+    )
@@ -1,4 +1,5 @@
 import pytest
+from rasper_ducky.duckyscript.clock import VirtualClock
 from rasper_ducky.duckyscript.interpreter import (
     Interpreter,
 )
@@ -28,12 +29,16 @@ def interpreter():
 
 @pytest.fixture
 def mock_keyboard(mocker):
-    mock_press = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.press_key")
-    mock_release = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_key")
+    mock_press = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.press_keycodes")
+    mock_release = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_keycodes")
     mock_release_all = mocker.patch("rasper_ducky.duckyscript.keyboard.RasperDuckyKeyboard.release_all")
     return mock_press, mock_release, mock_release_all
 
 
+def keycodes(*keys: str) -> bytes:
+    return Interpreter().keyboard.keycodes(keys)
+
+
 def test_var_declaration(interpreter):
     ast = [
         VarStmt(
@@ -413,11 +418,12 @@ def test_boolean_in_if_statement(interpreter):
     assert interpreter.execution_stack == ["A", "B"]
 
 
-def test_delay_statement(interpreter, mocker):
-    mock_sleep = mocker.patch("time.sleep")
-    ast = [DelayStmt(Literal("10"))]
+def test_delay_statement():
+    clock = VirtualClock()
+    interpreter = Interpreter(clock=clock)
+    ast = [DelayStmt(Literal("10")), DelayStmt(Literal("2.5"))]
     interpreter.interpret(ast)
-    mock_sleep.assert_called_once_with(0.01)
+    assert clock.now_ns == 12_500_000
     assert interpreter.execution_stack == []
 
 
@@ -429,7 +435,9 @@ def test_kbd_statement(interpreter):
 
 
 def test_random_char_statement(interpreter, mocker):
-    mock_choice = mocker.patch("random.choice")
+    mock_choice = mocker.patch(
+        "rasper_ducky.duckyscript.randomchars.RandomChars.string", return_value="a"
+    )
 
     ast = [
         RandomCharStmt(Token(Tok.RANDOM_CHAR, "RANDOM_LOWERCASE_LETTER")),
@@ -443,11 +451,13 @@ def test_random_char_statement(interpreter, mocker):
     assert mock_choice.call_count == len(Interpreter.RANDOM_CHAR_SETS)
 
     for value in Interpreter.RANDOM_CHAR_SETS.values():
-        mock_choice.assert_any_call(value)
+        mock_choice.assert_any_call(value, 1)
 
 
 def test_random_char_from_statement(interpreter, mocker):
-    mock_choice = mocker.patch("random.choice")
+    mock_choice = mocker.patch(
+        "rasper_ducky.duckyscript.randomchars.RandomChars.string", return_value="a"
+    )
 
     ast = [
         RandomCharFromStmt(
@@ -466,7 +476,7 @@ def test_keypress_statement(interpreter, mock_keyboard):
     ast = [KeyPressStmt([Token(Tok.KEYPRESS, "A")])]
     interpreter.interpret(ast)
 
-    mock_press.assert_called_once_with("A")
+    mock_press.assert_called_once_with(keycodes("A"))
     mock_release.assert_not_called()
     mock_release_all.assert_called_once()
 
@@ -477,7 +487,7 @@ def test_keypress_statement_with_hold(interpreter, mock_keyboard):
     ast = [KeyPressStmt([Token(Tok.KEYPRESS, "A")], hold=True)]
     interpreter.interpret(ast)
 
-    mock_press.assert_called_once_with("A")
+    mock_press.assert_called_once_with(keycodes("A"))
     mock_release.assert_not_called()
     mock_release_all.assert_not_called()
 
@@ -489,6 +499,6 @@ def test_keypress_statement_with_release(interpreter, mock_keyboard):
     interpreter.interpret(ast)
 
     mock_press.assert_not_called()
-    mock_release.assert_called_once_with("A")
+    mock_release.assert_called_once_with(keycodes("A"))
     mock_release_all.assert_not_called()
 
@@ -0,0 +1,111 @@
+import asyncio
+import io
+import itertools
+
+import pytest
+from conftest import parse, simulate, simulated_interpreter
+
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.jitter import Jitter
+from rasper_ducky.duckyscript.randomchars import RandomChars
+from rasper_ducky.duckyscript.simulation import SimulatedDevice
+
+JITTERY = """
+$_RANDOM_SEED = 7
+$_JITTER_MAX = 30
+$_JITTER_ENABLED = TRUE
+STRING abcdefghijklmnop
+"""
+
+
+def gaps(device: SimulatedDevice) -> list[int]:
+    times = [timestamp for timestamp, _ in device.events]
+    return [later - earlier for earlier, later in itertools.pairwise(times)]
+
+
+def test_waits_stay_under_the_maximum():
+    jitter = Jitter(VirtualClock(), RandomChars(1), max_ms=5, size=200)
+    waits = {jitter.next_ns() for _ in range(200)}
+    assert waits == {ms * 1_000_000 for ms in range(6)}
+
+
+def test_below_covers_the_range():
+    random = RandomChars(3)
+    assert {random.below(3) for _ in range(100)} == {0, 1, 2}
+    assert max(random.below(1000) for _ in range(1000)) < 1000
+
+
+def test_maximum_is_checked():
+    with pytest.raises(ValueError, match="from 0 to 1000 ms"):
+        Jitter(VirtualClock(), RandomChars(), max_ms=1001)
+
+
+def test_only_the_waits_used_are_drawn_again():
+    jitter = Jitter(VirtualClock(), RandomChars(1), size=8)
+    offsets = list(jitter.offsets)
+    jitter.next_ns()
+    jitter.next_ns()
+    assert jitter.used == 2
+    jitter.refill()
+    assert jitter.used == 0
+    assert list(jitter.offsets)[2:] == offsets[2:]
+
+
+def test_refill_stops_at_the_deadline():
+    clock = VirtualClock()
+    jitter = Jitter(clock, RandomChars(1), size=8)
+    for _ in range(8):
+        jitter.next_ns()
+    jitter.refill(until_ns=0)
+    assert jitter.used == 8
+
+
+def test_jitter_is_off_by_default():
+    simulation = simulate("STRING abcdefghijklmnop")
+    assert set(gaps(simulation.device)) == {0}
+
+
+def test_jitter_spreads_the_reports_in_the_trace():
+    device = simulate(JITTERY).device
+    assert device.typed() == "abcdefghijklmnop"
+    spread = gaps(device)
+    assert len(set(spread)) > 1
+    assert all(0 <= gap <= 30_000_000 for gap in spread)
+
+
+def test_seeded_traces_are_reproducible():
+    traces = []
+    for _ in range(2):
+        output = io.StringIO()
+        simulate(JITTERY).device.export(output)
+        traces.append(output.getvalue())
+    assert traces[0] == traces[1]
+
+
+def test_seed_doesnt_change_the_random_characters():
+    typed = simulate("$_RANDOM_SEED = 1\nRANDOM_NUMBER 12").device.typed()
+    assert typed == "324016847847"
+
+
+def test_jitter_can_be_turned_off():
+    device = simulate(JITTERY + "$_JITTER_ENABLED = FALSE\nDELAY 10\nSTRING abc").device
+    assert set(gaps(device)[-3:]) == {0}
+
+
+def test_waits_used_are_drawn_again_during_delays():
+    simulation = simulate(JITTERY + "DELAY 100")
+    assert simulation.interpreter.jitter.used == 0
+
+
+def test_jitter_is_kept_by_rd_kbd():
+    simulation = simulate(JITTERY + "RD_KBD WIN FR")
+    assert simulation.interpreter.keyboard.jitter is simulation.interpreter.jitter
+
+
+def test_async_interpreter_waits_the_jitter():
+    interpreter = simulated_interpreter(AsyncInterpreter)
+    asyncio.run(interpreter.run(parse(JITTERY)))
+    device = interpreter.device
+    assert device.typed() == "abcdefghijklmnop"
+    assert len(set(gaps(device))) > 1
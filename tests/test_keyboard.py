@@ -0,0 +1,202 @@
+import pytest
+from usb_hid import Device
+
+from rasper_ducky.duckyscript.abort import AbortFlag, PayloadAborted
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.keyboard import RasperDuckyKeyboard
+
+LEFT_CTRL = 0x01
+LEFT_SHIFT = 0x02
+LEFT_ALT = 0x04
+RELEASED = bytes(8)
+
+
+def report(modifier: int = 0, *keycodes: int) -> bytes:
+    return bytes([modifier, 0, *keycodes, *[0] * (6 - len(keycodes))])
+
+
+@pytest.fixture
+def keyboard():
+    return RasperDuckyKeyboard("win", "uk")
+
+
+@pytest.fixture
+def sent_reports(keyboard, mocker):
+    reports: list[bytes] = []
+    mocker.patch.object(
+        keyboard.device,
+        "send_report",
+        side_effect=lambda report, report_id=None: reports.append(bytes(report)),
+    )
+    return reports
+
+
+def test_type_string_packs_consecutive_characters(keyboard, sent_reports):
+    keyboard.type_string("abc")
+    assert sent_reports == [
+        report(0, 0x04),
+        report(0, 0x04, 0x05),
+        report(0, 0x04, 0x05, 0x06),
+        RELEASED,
+    ]
+
+
+def test_type_string_releases_before_a_modifier_change(keyboard, sent_reports):
+    keyboard.type_string("aB")
+    assert sent_reports == [
+        report(0, 0x04),
+        RELEASED,
+        report(LEFT_SHIFT, 0x05),
+        RELEASED,
+    ]
+
+
+def test_type_string_releases_before_a_repeated_character(keyboard, sent_reports):
+    keyboard.type_string("ll")
+    assert sent_reports == [report(0, 0x0F), RELEASED, report(0, 0x0F), RELEASED]
+
+
+def test_type_string_releases_a_full_report(keyboard, sent_reports):
+    keyboard.type_string("abcdefg")
+    assert sent_reports[5] == report(0, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09)
+    assert sent_reports[6:] == [RELEASED, report(0, 0x0A), RELEASED]
+
+
+def test_type_string_with_dead_key(keyboard, sent_reports):
+    keyboard.type_string("ê")
+    assert sent_reports == [report(0, 0x2F), RELEASED, report(0, 0x08), RELEASED]
+
+
+def test_type_string_with_untypeable_character(keyboard, sent_reports):
+    with pytest.raises(ValueError, match="No keycode available"):
+        keyboard.type_string("ж")
+
+
+def test_type_line_packs_enter(keyboard, sent_reports):
+    keyboard.type_line("a")
+    assert sent_reports == [report(0, 0x04), report(0, 0x04, 0x28), RELEASED]
+
+
+def test_press_keys_sends_a_chord_in_one_report(keyboard, sent_reports):
+    keyboard.press_keys("CTRL", "ALT", "DELETE")
+    keyboard.release_all()
+    assert sent_reports == [report(LEFT_CTRL | LEFT_ALT, 0x4C), RELEASED]
+
+
+def test_release_keys_keeps_the_other_keys_pressed(keyboard, sent_reports):
+    keyboard.press_keys("SHIFT", "A", "B")
+    keyboard.release_keys("SHIFT", "A")
+    assert sent_reports == [report(LEFT_SHIFT, 0x04, 0x05), report(0, 0x05)]
+
+
+def test_press_more_than_six_keys(keyboard, sent_reports):
+    with pytest.raises(ValueError, match="more than six keys"):
+        keyboard.press_keys("A", "B", "C", "D", "E", "F", "G")
+
+
+def test_reports_are_paced_to_the_rate(keyboard, sent_reports, mocker):
+    clock = [0]
+    mocker.patch("time.monotonic_ns", side_effect=lambda: clock[0])
+    sleeps: list[float] = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += int(seconds * 1_000_000_000)
+
+    mocker.patch("time.sleep", side_effect=sleep)
+
+    keyboard.set_rate(100)
+    keyboard.type_string("ab")
+
+    # Each key is released as soon as it is pressed
+    assert sent_reports == [report(0, 0x04), report(), report(0, 0x05), report()]
+    assert sleeps == [0.01]
+
+
+def test_keystroke_delay(keyboard):
+    keyboard.set_keystroke_delay(20)
+    assert keyboard.keystroke_interval_ns == 20_000_000
+    keyboard.set_rate(0)
+    assert keyboard.keystroke_interval_ns == 0
+
+
+def test_led_status_is_kept_between_host_reports(keyboard):
+    assert keyboard.led_status == 0
+    keyboard.device.receive_report(bytes([RasperDuckyKeyboard.LED_CAPS_LOCK]))
+    assert keyboard.led_on(RasperDuckyKeyboard.LED_CAPS_LOCK)
+    assert keyboard.led_on(RasperDuckyKeyboard.LED_CAPS_LOCK)
+    assert not keyboard.led_on(RasperDuckyKeyboard.LED_NUM_LOCK)
+
+
+def test_release_all_without_pressed_keys_sends_nothing(keyboard, sent_reports):
+    keyboard.release_all()
+    keyboard.release_keys("CTRL", "A")
+    assert sent_reports == []
+
+
+def test_hold_and_release_send_only_changes(keyboard, sent_reports):
+    keyboard.press_keys("CTRL")
+    keyboard.press_keys("CTRL")
+    keyboard.press_keys("CTRL", "C")
+    keyboard.release_keys("C")
+    keyboard.release_keys("C")
+    keyboard.release_all()
+    keyboard.release_all()
+    assert sent_reports == [
+        report(LEFT_CTRL),
+        report(LEFT_CTRL, 0x06),
+        report(LEFT_CTRL),
+        RELEASED,
+    ]
+
+
+def plugged_keyboard(enumeration_ms: int, led_report: bytes | None = b"\x02"):
+    clock = VirtualClock()
+    device = Device(usage_page=0x01, usage=0x06)
+    device.plug(clock, enumeration_ms, led_report)
+    return RasperDuckyKeyboard("win", "uk", device, clock), clock
+
+
+def test_wait_for_host_returns_once_the_leds_are_reported():
+    keyboard, clock = plugged_keyboard(enumeration_ms=230)
+    assert keyboard.wait_for_host(timeout_ms=3000)
+    assert 230_000_000 <= clock.monotonic_ns() < 240_000_000
+    assert keyboard.led_on(RasperDuckyKeyboard.LED_CAPS_LOCK)
+
+
+def test_wait_for_host_on_a_ready_host_returns_at_once():
+    keyboard, clock = plugged_keyboard(enumeration_ms=0)
+    assert keyboard.wait_for_host()
+    assert clock.monotonic_ns() == 0
+
+
+def test_wait_for_host_gives_up_without_led_report():
+    keyboard, clock = plugged_keyboard(enumeration_ms=100, led_report=None)
+    assert not keyboard.wait_for_host(timeout_ms=500)
+    assert clock.monotonic_ns() >= 500_000_000
+
+
+def test_wait_for_host_gives_up_without_enumeration():
+    keyboard, _ = plugged_keyboard(enumeration_ms=10_000)
+    assert not keyboard.wait_for_host(timeout_ms=500)
+
+
+def test_wait_for_host_can_be_aborted():
+    clock = VirtualClock()
+    device = Device(usage_page=0x01, usage=0x06)
+    device.plug(clock, 10_000)
+    abort = AbortFlag()
+    keyboard = RasperDuckyKeyboard("win", "uk", device, clock, abort)
+    abort.request()
+    with pytest.raises(PayloadAborted):
+        keyboard.wait_for_host()
+
+
+def test_first_delay_is_counted_from_the_host_wait():
+    clock = VirtualClock()
+    device = Device(usage_page=0x01, usage=0x06)
+    device.plug(clock, enumeration_ms=100, led_report=None)
+    interpreter = Interpreter(device, clock)
+    assert not interpreter.wait_for_host(timeout_ms=3000)
+    assert interpreter.scheduler.deadline_ns == clock.monotonic_ns()
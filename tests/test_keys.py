@@ -0,0 +1,32 @@
+import keycode_win_fr
+import keycode_win_uk
+
+from rasper_ducky.duckyscript.keyboard import RasperDuckyKeyboard
+from rasper_ducky.duckyscript.keys import KEY_NAMES, keycode_table, pack_keycodes
+from rasper_ducky.duckyscript.lexer import Lexer, Tok
+
+
+def test_lexer_keypress_keywords_match_key_names():
+    keypress = {
+        keyword for keyword, token in Lexer.KEYWORDS.items() if token == Tok.KEYPRESS
+    }
+    assert keypress == set(KEY_NAMES)
+
+
+def test_keycode_table_resolves_aliases():
+    table = keycode_table("win_uk", pack_keycodes(keycode_win_uk))
+    assert table["CTRL"] == table["CONTROL"] == keycode_win_uk.Keycode.CONTROL
+    assert table["ESC"] == table["ESCAPE"] == keycode_win_uk.Keycode.ESCAPE
+
+
+def test_keycode_table_is_built_once_per_layout():
+    uk = pack_keycodes(keycode_win_uk)
+    fr = pack_keycodes(keycode_win_fr)
+    assert keycode_table("win_uk", uk) is keycode_table("win_uk", uk)
+    assert keycode_table("win_uk", uk) is not keycode_table("win_fr", fr)
+
+
+def test_keyboards_share_keycode_table():
+    first = RasperDuckyKeyboard("win", "uk")
+    second = RasperDuckyKeyboard("win", "uk")
+    assert first.KEYCODES is second.KEYCODES
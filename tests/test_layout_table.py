@@ -0,0 +1,76 @@
+import keyboard_layout_win_uk
+import keycode_win_uk
+import pytest
+
+from rasper_ducky.duckyscript import layout_table as layout_table_module
+from rasper_ducky.duckyscript.keys import pack_keycodes
+from rasper_ducky.duckyscript.layout_table import LayoutTable, layout_table
+
+LEFT_SHIFT = 0x02
+RIGHT_ALT = 0x40
+
+
+@pytest.fixture
+def table():
+    return LayoutTable.from_modules(keyboard_layout_win_uk, keycode_win_uk)
+
+
+def test_ascii_strokes(table):
+    assert table.stroke("a") == 0x04
+    assert table.stroke("A") == (LEFT_SHIFT << 8) | 0x04
+    assert table.stroke("\n") == 0x28
+
+
+def test_higher_strokes_with_altgr(table):
+    assert table.stroke("€") == (RIGHT_ALT << 8) | 0x08
+
+
+def test_combined_strokes(table):
+    assert table.stroke("ê") == 0
+    assert table.combined_stroke("ê") == (0x2F << 8) | ord("e")
+    assert table.combined_stroke("a") == 0
+
+
+def test_untypeable_characters_have_no_stroke(table):
+    assert table.stroke("\x00") == 0
+    assert table.stroke("ж") == 0
+    assert table.combined_stroke("ж") == 0
+
+
+def test_keycodes_are_packed_in_key_names_order(table):
+    assert bytes(table.keycodes) == pack_keycodes(keycode_win_uk)
+
+
+def test_save_and_load(table, tmp_path):
+    path = str(tmp_path / "win_uk.rdl")
+    table.save(path)
+    loaded = LayoutTable.load(path)
+
+    assert loaded.to_bytes() == table.to_bytes()
+    for char in "aA\n€êж":
+        assert loaded.stroke(char) == table.stroke(char)
+        assert loaded.combined_stroke(char) == table.combined_stroke(char)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "win_uk.rdl"
+    path.write_bytes(b"NOPE" + bytes(20))
+    with pytest.raises(ValueError, match="Unsupported layout table"):
+        LayoutTable.load(str(path))
+
+
+def test_layout_table_is_loaded_once_per_layout():
+    assert layout_table("win", "uk") is layout_table("win", "uk")
+
+
+def test_layout_table_prefers_compiled_file(table, tmp_path, mocker):
+    mocker.patch.object(layout_table_module, "LAYOUTS_DIR", str(tmp_path))
+    mocker.patch.dict(layout_table_module._LAYOUT_TABLES, clear=True)
+    table.save(str(tmp_path / "win_uk.rdl"))
+
+    assert isinstance(layout_table("win", "uk").ascii, memoryview)
+
+
+def test_unknown_layout():
+    with pytest.raises(ValueError, match="Language xx not supported for platform win"):
+        layout_table("win", "xx")
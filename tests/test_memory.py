@@ -0,0 +1,79 @@
+import io
+
+import pytest
+
+from rasper_ducky.duckyscript import memory
+from rasper_ducky.duckyscript.lexer import Lexer
+from rasper_ducky.duckyscript.memory import MemoryReport
+from rasper_ducky.duckyscript.parser import Parser
+from rasper_ducky.duckyscript.preprocessor import Preprocessor
+
+
+def test_stages_are_measured_in_order():
+    memory = MemoryReport()
+    code = memory.measure("Preprocessor", Preprocessor().process, "STRING a\n" * 200)
+    tokens = memory.measure("Lexer", list, Lexer(code).tokenize())
+    ast = memory.measure("Parser", Parser(tokens).parse)
+
+    assert len(ast) == 200
+    assert [stage[0] for stage in memory.stages] == ["Preprocessor", "Lexer", "Parser"]
+    for _, free, peak, retained, error in memory.stages:
+        assert free is None
+        assert peak >= retained
+        assert error is None
+
+
+def test_peak_and_retained_allocations():
+    memory = MemoryReport()
+    kept = memory.measure("Kept", bytearray, 100_000)
+    memory.measure("Dropped", lambda: len(bytearray(100_000)))
+
+    _, _, peak, retained, _ = memory.stages[0]
+    assert peak >= 100_000
+    assert retained >= 100_000
+    _, _, peak, retained, _ = memory.stages[1]
+    assert peak >= 100_000
+    assert retained < 100_000
+    assert len(kept) == 100_000
+
+
+def test_failing_stage_is_reported():
+    memory = MemoryReport()
+
+    def fail():
+        raise MemoryError("memory allocation failed")
+
+    with pytest.raises(MemoryError):
+        memory.measure("Parser", fail)
+    assert memory.stages[0][4] == "MemoryError"
+
+    file = io.StringIO()
+    memory.export_text(file)
+    assert file.getvalue().splitlines()[1].startswith("Parser")
+    assert file.getvalue().splitlines()[1].endswith("MemoryError")
+
+
+def test_disabled_report_only_runs_the_stages():
+    memory = MemoryReport(enabled=False)
+    assert memory.measure("Lexer", list, "abc") == ["a", "b", "c"]
+    assert memory.stages == []
+
+
+def test_free_memory_on_circuitpython(monkeypatch):
+    # Heap of 1000 bytes, 100 of them allocated by the stage and 40 kept
+    heap = {"free": 1000}
+
+    def allocate():
+        heap["free"] -= 100
+        return "ast"
+
+    def collect():
+        heap["free"] = min(heap["free"] + 60, 1000)
+
+    monkeypatch.setattr(memory, "tracemalloc", None)
+    monkeypatch.setattr(memory.gc, "collect", collect)
+    monkeypatch.setattr(memory.gc, "mem_free", lambda: heap["free"], raising=False)
+
+    report = memory.MemoryReport()
+    assert report.measure("Parser", allocate) == "ast"
+    assert report.stages == [("Parser", 1000, 100, 40, None)]
@@ -21,6 +21,7 @@ from rasper_ducky.duckyscript.parser import (
     DelayStmt,
     Unary,
     ExpressionStmt,
+    WaitForLedStmt,
 )
 
 
@@ -507,3 +508,25 @@ def test_keypress_hold_release_statement(parser):
         KeyPressStmt([Token(Tok.KEYPRESS, "A")], False, True),
     ]
     assert ast == expected_ast
+
+
+def test_delay_settings_are_internal_variables(parser):
+    tokens = [
+        Token(Tok.DEFAULT_DELAY, "DEFAULT_DELAY"),
+        Token(Tok.NUMBER, "100"),
+        Token(Tok.EOL),
+        Token(Tok.STRING_DELAY, "STRINGDELAY"),
+        Token(Tok.NUMBER, "20"),
+        Token(Tok.EOF),
+    ]
+    ast = parser(tokens).parse()
+    assert ast == [
+        VarStmt(Token(Tok.IDENTIFIER, "$_DEFAULT_DELAY"), Literal("100")),
+        VarStmt(Token(Tok.IDENTIFIER, "$_STRING_DELAY"), Literal("20")),
+    ]
+
+
+def test_wait_for_led_statement(parser):
+    tokens = [Token(Tok.WAIT_FOR_LED, "WAIT_FOR_CAPS_ON"), Token(Tok.EOF)]
+    ast = parser(tokens).parse()
+    assert ast == [WaitForLedStmt(Token(Tok.WAIT_FOR_LED, "WAIT_FOR_CAPS_ON"))]
@@ -0,0 +1,72 @@
+import io
+
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.interpreter import Interpreter
+
+PAYLOAD = """FUNCTION open_powershell()
+    GUI R
+    DELAY 500
+    STRINGLN powershell
+END_FUNCTION
+
+open_powershell()
+$x = 0
+WHILE ($x < 3)
+    STRING Hello
+    DELAY 100
+    $x = $x + 1
+END_WHILE
+"""
+
+
+def profile(code: str):
+    interpreter = simulated_interpreter()
+    profiler = interpreter.enable_profiler()
+    interpreter.interpret(parse(code))
+    return profiler
+
+
+def test_disabled_profiler_adds_nothing():
+    interpreter = Interpreter()
+    assert interpreter.profiler is None
+    assert "_execute" not in vars(interpreter)
+
+
+def test_statements_know_their_line():
+    ast = parse(PAYLOAD)
+    assert [statement.line for statement in ast] == [1, 7, 8, 9]
+    assert [statement.line for statement in ast[3].body] == [10, 11, 12]
+
+
+def test_line_stats():
+    profiler = profile(PAYLOAD)
+    assert profiler.lines[3] == [1, 500_000_000, 0]
+    assert profiler.lines[4] == [1, 0, 11]
+    assert profiler.lines[7] == [1, 500_000_000, 13]
+    assert profiler.lines[9] == [1, 300_000_000, 15]
+    assert profiler.lines[10] == [3, 0, 15]
+    assert profiler.lines[11] == [3, 300_000_000, 0]
+
+
+def test_function_stats():
+    profiler = profile(PAYLOAD)
+    assert profiler.functions == {"open_powershell": [1, 500_000_000, 13]}
+
+
+def test_export_text():
+    output = io.StringIO()
+    profile(PAYLOAD).export_text(output)
+    lines = output.getvalue().splitlines()
+    assert lines[0].split() == ["Line", "Count", "Time", "(ms)", "Keystrokes"]
+    assert lines[3].split() == ["3", "1", "500.000", "0"]
+    assert lines[-1].split() == ["open_powershell()", "1", "500.000", "13"]
+
+
+def test_export_collapsed():
+    output = io.StringIO()
+    profile(PAYLOAD).export_collapsed(output)
+    lines = output.getvalue().splitlines()
+    assert "payload;line 7;open_powershell();line 3 500000" in lines
+    assert "payload;line 9;line 11 300000" in lines
+    assert "payload;line 9 0" in lines
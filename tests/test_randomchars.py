@@ -0,0 +1,64 @@
+import pytest
+from conftest import parse, simulate
+
+from rasper_ducky.duckyscript.keyboard import RasperDuckyKeyboard
+from rasper_ducky.duckyscript.parser import RandomCharStmt, Tok, Token
+from rasper_ducky.duckyscript.randomchars import RandomChars
+
+
+def test_seeded_characters_are_the_same_everywhere():
+    # The xorshift generator gives these on CircuitPython too
+    assert RandomChars(1).string("0123456789", 12) == "324016847847"
+
+
+def test_seeded_runs_are_reproducible():
+    assert RandomChars(42).string("abcdef", 50) == RandomChars(42).string("abcdef", 50)
+    assert RandomChars(42).string("abcdef", 50) != RandomChars(43).string("abcdef", 50)
+
+
+def test_unseeded_characters_come_from_the_set():
+    chars = RandomChars().string("xyz", 300)
+    assert len(chars) == 300
+    assert set(chars) == {"x", "y", "z"}
+
+
+def test_large_sets_are_picked_from_whole():
+    chars = "".join(chr(0x100 + i) for i in range(300))
+    picked = RandomChars(7).string(chars, 2000)
+    assert set(picked) <= set(chars)
+    assert any(ord(char) >= 0x100 + 256 for char in picked)
+
+
+def test_empty_set():
+    with pytest.raises(ValueError):
+        RandomChars().string("")
+
+
+def test_count_is_parsed():
+    assert parse("RANDOM_NUMBER 8\n") == [
+        RandomCharStmt(Token(Tok.RANDOM_CHAR, "RANDOM_NUMBER", 1, 1), 8)
+    ]
+    with pytest.raises(SyntaxError):
+        parse("RANDOM_NUMBER 2.5\n")
+
+
+def test_count_is_typed_at_once(mocker):
+    type_string = mocker.spy(RasperDuckyKeyboard, "type_string")
+    typed = simulate("$_RANDOM_SEED = 3\nRANDOM_LOWERCASE_LETTER 8\n").device.typed()
+    assert len(typed) == 8
+    assert typed.islower()
+    assert type_string.call_count == 1
+
+
+def test_random_seed_setting():
+    code = """
+    $_RANDOM_SEED = 1234
+    RANDOM_CHAR 10
+    RANDOM_CHAR_FROM abc
+    """
+    first, second, other = (
+        simulate(seeded).device.typed()
+        for seeded in (code, code, code.replace("1234", "4321"))
+    )
+    assert first == second
+    assert first != other
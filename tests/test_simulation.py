@@ -0,0 +1,177 @@
+import io
+import itertools
+import time
+
+import pytest
+from conftest import parse, simulate
+
+from rasper_ducky.duckyscript.simulation import Simulation
+
+
+def test_delay_advances_the_virtual_clock_only():
+    start = time.monotonic()
+    simulation = simulate("DELAY 30000")
+    assert time.monotonic() - start < 1
+    assert simulation.elapsed_ms == 30000
+
+
+def test_reports_are_timestamped():
+    simulation = simulate(
+        """
+        STRING a
+        DELAY 500
+        CTRL C
+        """
+    )
+    assert simulation.device.keystrokes() == [
+        (0, 0x00, 0x04),
+        (500_000_000, 0x01, 0x06),
+    ]
+
+
+def test_typed_text():
+    simulation = simulate(
+        """
+        STRINGLN Hello, World!
+        GUI R
+        STRING bye
+        """
+    )
+    assert simulation.device.typed() == "Hello, World!\nbye"
+
+
+def test_string_delay_spreads_keystrokes():
+    simulation = simulate(
+        """
+        STRING_DELAY 20
+        STRING abc
+        """
+    )
+    timestamps = [timestamp for timestamp, _, _ in simulation.device.keystrokes()]
+    assert timestamps == [0, 20_000_000, 40_000_000]
+
+
+@pytest.mark.parametrize("text", ["abcdef", "aaaaaa", "aBcDeF"])
+def test_string_delay_paces_each_keystroke(text):
+    simulation = simulate(f"STRING_DELAY 100\nSTRING {text}\n")
+    timestamps = [timestamp for timestamp, _, _ in simulation.device.keystrokes()]
+    assert timestamps == [i * 100_000_000 for i in range(6)]
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "STRING_DELAY 200\nSTRING abcdef\n",
+        "STRING_DELAY 600\nSTRING aAa\n",
+        "$_RANDOM_SEED = 1\n$_JITTER_MAX = 1000\n$_JITTER_ENABLED = TRUE\nSTRINGLN abc\n",
+    ],
+)
+def test_paced_keys_are_released_at_once(code):
+    # A key held while waiting for the next one would be repeated by the host
+    events = simulate(code).device.events
+    for (pressed_at, report), (released_at, release) in itertools.pairwise(events):
+        if any(report):
+            assert release == bytes(8)
+            assert released_at == pressed_at
+    assert events[-1][1] == bytes(8)
+
+
+def test_rate_is_reached_with_distinct_characters():
+    simulation = Simulation()
+    simulation.interpreter.keyboard.set_rate(100)
+    text = "abcdefghijklmnopqrstuvwxyz0123456789" * 3
+    simulation.run(parse(f"STRING {text}\n"))
+    timestamps = [timestamp for timestamp, _, _ in simulation.device.keystrokes()]
+    keys_per_second = (len(timestamps) - 1) * 1e9 / (timestamps[-1] - timestamps[0])
+    assert keys_per_second == pytest.approx(100)
+
+
+def test_host_answers_lock_keys_with_leds():
+    simulation = simulate(
+        """
+        CAPSLOCK
+        WAIT_FOR_CAPS_CHANGE
+        STRING a
+        """,
+        host_latency_ms=25,
+    )
+    assert simulation.device.keystrokes()[-1] == (25_000_000, 0x00, 0x04)
+
+
+@pytest.mark.parametrize(
+    "setting", ["DEFAULT_DELAY 50", "STRING_DELAY 40", "$_JITTER_ENABLED = TRUE"]
+)
+def test_lock_key_answered_before_the_change_wait(setting):
+    # The host answers during the wait after CAPSLOCK, before WAIT_FOR_CAPS_CHANGE
+    simulation = simulate(
+        f"""
+        {setting}
+        CAPSLOCK
+        WAIT_FOR_CAPS_CHANGE
+        STRING a
+        """,
+        host_latency_ms=5,
+    )
+    assert simulation.device.typed() == "a"
+
+
+def test_change_waits_follow_each_other():
+    simulation = simulate(
+        """
+        DEFAULT_DELAY 50
+        CAPSLOCK
+        WAIT_FOR_CAPS_CHANGE
+        CAPSLOCK
+        WAIT_FOR_CAPS_CHANGE
+        STRING a
+        """,
+        host_latency_ms=5,
+    )
+    assert simulation.device.leds == 0
+    assert simulation.device.typed() == "a"
+
+
+def test_delay_after_a_led_wait_is_waited_in_full():
+    simulation = simulate(
+        """
+        CAPSLOCK
+        WAIT_FOR_CAPS_CHANGE
+        DELAY 1000
+        STRING a
+        """,
+        host_latency_ms=4000,
+    )
+    assert simulation.device.keystrokes()[-1][0] >= 5_000_000_000
+
+
+def test_delay_is_counted_from_the_start_of_the_run():
+    simulation = Simulation()
+    # Time spent between building the interpreter and running the payload
+    simulation.clock.sleep(3)
+    simulation.run(parse("DELAY 2000\nSTRING a\n"))
+    assert simulation.device.keystrokes()[0][0] == 5_000_000_000
+
+
+def test_led_state_is_kept_when_changing_layout():
+    simulation = Simulation()
+    # Num Lock on before the payload starts
+    simulation.device.led_reports.append((0, 0x01))
+    code = """
+        WAIT_FOR_NUM_ON
+        RD_KBD WIN UK
+        WAIT_FOR_NUM_ON
+        STRING a
+        """
+    simulation.run(parse(code))
+    assert simulation.device.typed() == "a"
+
+
+def test_export():
+    simulation = simulate("STRING a")
+    output = io.StringIO()
+    simulation.device.export(output)
+    assert output.getvalue().splitlines() == [
+        "0.000 00 00 00 00 00 00 00 00",
+        "0.000 00 00 04 00 00 00 00 00",
+        "0.000 00 00 00 00 00 00 00 00",
+    ]
@@ -0,0 +1,73 @@
+from conftest import simulate
+
+from rasper_ducky.duckyscript.clock import VirtualClock
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.scheduler import DelayScheduler
+
+
+def test_counters():
+    simulation = simulate(
+        """
+        FUNCTION greet()
+            STRING Hi
+            DELAY 100
+        END_FUNCTION
+        $x = 0
+        WHILE ($x < 3)
+            greet()
+            $x = $x + 1
+        END_WHILE
+        STRINGLN done
+        """
+    )
+    stats = simulation.interpreter.stats()
+
+    assert stats["function_calls"] == 3
+    assert stats["characters"] == 10
+    assert stats["keystrokes"] == 11
+    assert stats["reports"] == len(simulation.device.events) - 1
+    assert stats["delays"] == 3
+    assert stats["delay_requested_ms"] == 300
+    assert stats["delay_slept_ms"] == 300
+    assert stats["elapsed_ms"] == 300
+
+
+def test_delays_sleep_less_than_requested_when_behind():
+    clock = VirtualClock()
+    scheduler = DelayScheduler(clock)
+    scheduler.wait(10)
+    # Time spent interpreting between the two DELAYs
+    clock.sleep(0.004)
+    scheduler.wait(10)
+
+    assert scheduler.requested_ns == 20_000_000
+    assert scheduler.slept_ns == 16_000_000
+
+
+def test_delay_lateness():
+    clock = VirtualClock()
+    interpreter = Interpreter(clock=clock)
+    interpreter.scheduler.wait(100)
+    clock.now_ns += 250_000_000
+    interpreter.scheduler.wait(100)
+    stats = interpreter.stats()
+
+    assert stats["late_delays"] == 1
+    assert stats["max_delay_lateness_ms"] == 150
+    assert stats["mean_delay_lateness_ms"] == 75
+
+
+def test_keystrokes_per_second():
+    simulation = simulate("STRING abcd")
+    interpreter = simulation.interpreter
+    # Typing time on a real clock
+    interpreter.started_ns -= 2_000_000_000
+    assert interpreter.stats()["keystrokes_per_second"] == 2
+
+
+def test_counters_survive_a_layout_change():
+    simulation = simulate("STRING ab\nRD_KBD WIN FR\nSTRING ab")
+    stats = simulation.interpreter.stats()
+    assert stats["characters"] == 4
+    assert stats["keystrokes"] == 4
+    assert stats["reports"] == len(simulation.device.events) - 2
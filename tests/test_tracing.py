@@ -0,0 +1,119 @@
+import asyncio
+
+from conftest import parse, simulated_interpreter
+
+from rasper_ducky.duckyscript.async_interpreter import AsyncInterpreter
+from rasper_ducky.duckyscript.interpreter import Interpreter
+from rasper_ducky.duckyscript.tracing import Tracer
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.events = []
+
+    def before_statement(self, node):
+        self.events.append(("before", node.line))
+
+    def after_statement(self, node):
+        self.events.append(("after", node.line))
+
+    def before_keystrokes(self, node):
+        self.events.append(("keys", node.line))
+
+    def after_keystrokes(self, node, keystrokes):
+        self.events.append(("typed", keystrokes))
+
+    def on_delay(self, milliseconds):
+        self.events.append(("delay", milliseconds))
+
+
+def run(code: str, *tracers: Tracer) -> Interpreter:
+    interpreter = simulated_interpreter()
+    for tracer in tracers:
+        interpreter.add_tracer(tracer)
+    interpreter.interpret(parse(code))
+    return interpreter
+
+
+def test_no_hooks_by_default():
+    interpreter = Interpreter()
+    assert "_execute" not in vars(interpreter)
+    assert "_default_delay" not in vars(interpreter)
+
+
+def test_hooks_are_called():
+    tracer = RecordingTracer()
+    run("STRING abc\nDELAY 50\n$x = 1\nCTRL C\n", tracer)
+    assert tracer.events == [
+        ("before", 1),
+        ("keys", 1),
+        ("typed", 3),
+        ("after", 1),
+        ("before", 2),
+        ("delay", "50"),
+        ("after", 2),
+        ("before", 3),
+        ("after", 3),
+        ("before", 4),
+        ("keys", 4),
+        ("typed", 2),
+        ("after", 4),
+    ]
+
+
+def test_default_delay_hook():
+    tracer = RecordingTracer()
+    run("DEFAULT_DELAY 20\nENTER\n", tracer)
+    assert ("delay", 20) in tracer.events
+
+
+def test_nested_statements_are_traced():
+    tracer = RecordingTracer()
+    run("$x = 0\nWHILE ($x < 2)\n$x = $x + 1\nEND_WHILE\n", tracer)
+    assert [line for event, line in tracer.events if event == "before"] == [
+        1,
+        2,
+        3,
+        3,
+    ]
+
+
+def test_several_tracers_and_profiler():
+    first = RecordingTracer()
+    second = RecordingTracer()
+    interpreter = simulated_interpreter()
+    profiler = interpreter.enable_profiler()
+    interpreter.add_tracer(first)
+    interpreter.add_tracer(second)
+    interpreter.interpret(parse("STRING a\n"))
+
+    assert (
+        first.events
+        == second.events
+        == [
+            ("before", 1),
+            ("keys", 1),
+            ("typed", 1),
+            ("after", 1),
+        ]
+    )
+    assert profiler.lines[1][0] == 1
+
+
+def test_async_interpreter_calls_the_same_hooks():
+    ast = parse(
+        "DEFAULT_DELAY 5\nFUNCTION f()\nSTRING abc\nEND_FUNCTION\n"
+        "VAR $r = f()\nDELAY 10\nCTRL C\nRANDOM_LETTER 3\n"
+    )
+    tracer = RecordingTracer()
+    interpreter = simulated_interpreter()
+    interpreter.add_tracer(tracer)
+    interpreter.interpret(ast)
+
+    async_tracer = RecordingTracer()
+    async_interpreter = simulated_interpreter(AsyncInterpreter)
+    async_interpreter.add_tracer(async_tracer)
+    asyncio.run(async_interpreter.run(ast))
+
+    assert ("typed", 3) in async_tracer.events
+    assert async_tracer.events == tracer.events